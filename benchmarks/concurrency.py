@@ -0,0 +1,180 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+
+# Builtin Imports
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+# Library Imports
+# […]
+
+# Project Imports
+from benchmarks.generator import HouseholdGenerator
+from benchmarks.learning import run_scenario
+
+_logger = logging.getLogger(__name__)
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _ErrorCounter(logging.Handler):
+    """Count the errors logged by the database (it logs failed queries instead of raising them)."""
+    def __init__(self) -> None:
+        super().__init__(logging.ERROR)
+        self.messages: List[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(self.format(record))
+
+
+def _stress(readers: int, seconds: float, batch_size: int, number_of_groups: int, seed: int) -> Dict[str, Any]:
+    """Read and write the database of the scenario in the current directory at the same time.
+
+    Each reader thread loads the events of the last day and the event sequences of each group in turn,
+    while a single writer thread stores new events in batches.
+    """
+    # The config and the item list are read from the current directory on import.
+    from sharly.database.sqlite import SQLiteDatabase
+    from sharly.util.config import CONFIG
+
+    errors = _ErrorCounter()
+    logging.getLogger('sharly.database').addHandler(errors)
+
+    database = SQLiteDatabase(CONFIG.database_name, clear=False, pragmas=CONFIG.database_pragmas)
+    household = HouseholdGenerator(number_of_groups, seed)
+    groups = household.groups
+    stop = threading.Event()
+    reads = [0] * readers
+    written = [0]
+
+    def read(i: int) -> None:
+        try:
+            while not stop.is_set():
+                group = groups[reads[i] % len(groups)]
+                database.get_events(group, interval=1)
+                database.get_event_sequences(group, compact=True)
+                reads[i] += 1
+        except Exception as e:
+            errors.messages.append(repr(e))
+        finally:
+            database.release()
+
+    def write() -> None:
+        # The events are generated up front, so the writer only measures storing.
+        events = list(HouseholdGenerator(number_of_groups, seed + 1).events(batch_size * 100, days=1))
+        try:
+            while not stop.is_set():
+                batch = events[written[0] % len(events):][:batch_size]
+                database.store_events(batch, batch_size)
+                written[0] += len(batch)
+        except Exception as e:
+            errors.messages.append(repr(e))
+
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(readers)]
+    threads.append(threading.Thread(target=write))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    database.disconnect()
+
+    return {
+        'readers': readers,
+        'seconds': elapsed,
+        'reads_per_second': sum(reads) / elapsed,
+        'written_events_per_second': written[0] / elapsed,
+        'errors': len(errors.messages),
+        'first_errors': errors.messages[:5],
+    }
+
+
+def _run_child(directory: str, *args: str) -> Dict[str, Any]:
+    """Run this module in a new process inside a scenario directory and get its result."""
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join(filter(None, [_ROOT, environment.get('PYTHONPATH')]))
+    process = subprocess.run([sys.executable, '-m', 'benchmarks.concurrency', *args], cwd=directory, env=environment,
+                             stdout=subprocess.PIPE, check=True, text=True)
+    return json.loads(process.stdout.splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Stress the database with concurrent readers and a writer.')
+    parser.add_argument('-e', '--events', help='number of events of the scenario', default=100_000, type=int)
+    parser.add_argument('-g', '--groups', help='number of groups of the scenario', default=10, type=int)
+    parser.add_argument('-s', '--seed', help='seed of the household', default=0, type=int)
+    parser.add_argument('-rd', '--readers', help='numbers of reader threads', nargs='+', type=int,
+                        default=[1, 2, 4, 8])
+    parser.add_argument('-t', '--time', help='duration (in sec) of each run', default=10, type=float)
+    parser.add_argument('-b', '--batch_size', help='number of events stored at once by the writer', default=100,
+                        type=int)
+    parser.add_argument('-d', '--directory', help='directory of the generated scenarios',
+                        default='benchmark_scenarios')
+    parser.add_argument('-o', '--output', help='JSON file of the results', default='benchmark_concurrency.json')
+    parser.add_argument('-v', '--verbose', help='enable verbose output', action='store_true')
+    parser.add_argument('child', help=argparse.SUPPRESS, nargs='*')  # used to run in the scenario directory
+    args = parser.parse_args()
+
+    if args.child:
+        command, *child_args = args.child
+        if command == 'stress':
+            readers, seconds, batch_size, number_of_groups, seed = child_args
+            print(json.dumps(_stress(int(readers), float(seconds), int(batch_size), int(number_of_groups),
+                                     int(seed))))
+        else:
+            parser.error(f'Unknown command "{command}"!')
+        return
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    # The scenario is learned first, so the readers also load event sequences.
+    directory = os.path.abspath(os.path.join(args.directory, f'{args.events}_events_{args.groups}_groups'))
+    run_scenario(directory, args.events, args.groups, args.seed, workers=1)
+
+    results = []
+    for readers in args.readers:
+        # Each run writes into a fresh copy, so the scenario stays as generated.
+        stress_directory = directory + '_stress'
+        shutil.rmtree(stress_directory, ignore_errors=True)
+        shutil.copytree(directory, stress_directory)
+        result = _run_child(stress_directory, 'stress', str(readers), str(args.time), str(args.batch_size),
+                            str(args.groups), str(args.seed))
+        print(f'{readers:>3} readers: {result["reads_per_second"]:8.1f} reads/s, '
+              f'{result["written_events_per_second"]:10.0f} written events/s, {result["errors"]} errors')
+        results.append(result)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'events': args.events,
+        'groups': args.groups,
+        'runs': results,
+    }
+    with open(args.output, 'w') as fp:
+        json.dump(report, fp, indent=2)
+
+    errors = sum(result['errors'] for result in results)
+    if errors:
+        print(f'{errors} errors while reading and writing concurrently!')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
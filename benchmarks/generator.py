@@ -0,0 +1,220 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+    from sharly.database import Database
+    from sharly.model.condition import Condition
+
+# Builtin Imports
+import configparser
+import datetime
+import itertools
+import json
+import logging
+import math
+import os
+import random
+
+# Library Imports
+# […]
+
+# Project Imports
+from sharly.model.condition.temperature import TemperatureCondition
+from sharly.model.condition.time_of_day import TimeOfDayCondition
+from sharly.model.event import Event, Item
+
+_logger = logging.getLogger(__name__)
+
+_CONFIG_FILENAME = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.ini')
+
+# Kinds of items with their states (the first state is the one which is learned)
+_ITEM_KINDS = (
+    ('Bewegungsmelder_Motion', ['ON']),
+    ('Switch', ['ON', 'OFF']),
+    ('DoorState', ['OPEN', 'CLOSED']),
+    ('Steckdose', ['ON']),
+    ('Fenster', ['OPEN', 'CLOSED']),
+)
+
+_TEMPERATURE_ITEM = 'Aussen_Temperatur'
+_TIME_OF_DAY_ITEM = 'Tageszeit'
+
+
+class HouseholdGenerator:
+    """A synthetic smart home, which generates the same events for the same seed.
+
+    Each group (room) has its own items and daily routines. A routine is a short sequence of items of a group,
+    which is triggered mostly at its preferred time of day. The routines are interleaved with noise:
+    random events of any item, repeated (bouncing) events and events with rejected states.
+    Every event holds the current time of day and outdoor temperature as conditions.
+    """
+    def __init__(self, number_of_groups: int, seed: int = 0, items_per_group: int = 6,
+                 routines_per_group: int = 4) -> None:
+        """Create a household.
+
+        Parameters
+        ----------
+        number_of_groups
+            The number of groups (rooms).
+        seed
+            The seed of the random generator.
+        items_per_group
+            The number of items of each group.
+        routines_per_group
+            The number of daily routines of each group.
+        """
+        self._seed = seed
+        self._random = random.Random(seed)
+        self._groups = [f'Raum{i}' for i in range(number_of_groups)]
+
+        self._items: Dict[str, Tuple[str, List[str]]] = {}  # name -> group, states
+        for group in self._groups:
+            for i in range(items_per_group):
+                kind, states = self._random.choice(_ITEM_KINDS)
+                self._items[f'{group}_{kind}{i}'] = (group, states)
+
+        self._routines: List[Tuple[datetime.time, List[str]]] = []
+        for group in self._groups:
+            group_items = [name for name, (item_group, _) in self._items.items() if item_group == group]
+            for _ in range(routines_per_group):
+                length = self._random.randint(2, min(6, len(group_items)))
+                preferred_time = datetime.time(self._random.randrange(24), self._random.randrange(60))
+                self._routines.append((preferred_time, self._random.sample(group_items, length)))
+        self._cumulative_weights: Dict[int, List[float]] = {}
+
+    @property
+    def groups(self) -> List[str]:
+        return list(self._groups)
+
+    def item_list(self) -> Dict[str, Any]:
+        """Get the item list of the household (see items.json)."""
+        return {
+            'items': [
+                {'name': name, 'groups': [group], 'states': states[:1]} for name, (group, states) in self._items.items()
+            ],
+            'conditions': [
+                {'name': _TEMPERATURE_ITEM, 'type': 'temperature'},
+                {'name': _TIME_OF_DAY_ITEM, 'type': 'time_of_day'},
+            ],
+            'rejected_states': ['UNDEF', 'INVALID']
+        }
+
+    def write_files(self, directory: str) -> None:
+        """Write the config and the item list of the household into a directory.
+
+        The config is a copy of the project config, which refers to the item list and a database in that directory.
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        parser = configparser.ConfigParser()
+        parser.read(_CONFIG_FILENAME)
+        parser.set('DEFAULT', 'item_list', 'items.json')
+        with open(os.path.join(directory, 'config.ini'), 'w') as fp:
+            parser.write(fp)
+
+        with open(os.path.join(directory, 'items.json'), 'w') as fp:
+            json.dump(self.item_list(), fp, indent=2)
+
+    def events(self, number_of_events: int, days: int = 6) -> Generator[Event, None, None]:
+        """Generate events, which are spread over the last days.
+
+        The events only depend on the seed, but their timestamps are relative to now,
+        so that they fall into the learning interval (none of them lies in the future).
+
+        Parameters
+        ----------
+        number_of_events
+            The number of events to generate.
+        days
+            The number of days before now, in which the events occur.
+        """
+        now = datetime.datetime.now()
+        span = days * 24 * 60 * 60
+        start = now - datetime.timedelta(seconds=span)
+
+        # The pauses are random, so the events are generated twice: first to find their duration,
+        # then to shrink it into the span if it is longer.
+        duration = 0.0
+        for *_, duration in self.__timeline(number_of_events, start, span):
+            pass
+        scale = min(1.0, span / duration) if duration else 1.0
+
+        for name, old_state, new_state, seconds in self.__timeline(number_of_events, start, span):
+            timestamp = min(start + datetime.timedelta(seconds=seconds * scale), now)
+            yield Event(Item(name, old_state, new_state), timestamp, self.__conditions(timestamp))
+
+    def __timeline(self, number_of_events: int, start: datetime.datetime, span: int
+                   ) -> Generator[Tuple[str, str, str, float], None, None]:
+        """Generate the items and states of the events with their seconds after start (see events)."""
+        rnd = random.Random(self._seed + 1)
+        seconds = 0.0
+
+        # The pause between two routines is scaled, so that all events fit into the span on average.
+        mean_routine_length = sum(len(items) for _, items in self._routines) / len(self._routines)
+        mean_gap = 10.0
+        mean_pause = max(1.0, span / (number_of_events / mean_routine_length) - mean_routine_length * mean_gap)
+
+        item_names = list(self._items)
+        i = 0
+        while i < number_of_events:
+            if rnd.random() < .2:
+                items = [rnd.choice(item_names)]
+            else:
+                items = self.__pick_routine(rnd, (start + datetime.timedelta(seconds=seconds)).time())
+
+            for name in items:
+                seconds += rnd.expovariate(1 / mean_gap)
+                states = self._items[name][1]
+                new_state = states[0] if rnd.random() > .02 else 'UNDEF'
+                old_state = states[-1] if len(states) > 1 else 'OFF'
+                yield name, old_state, new_state, seconds
+                i += 1
+
+                # Bouncing sensor
+                if rnd.random() < .05 and i < number_of_events:
+                    seconds += rnd.random() * 3
+                    yield name, old_state, new_state, seconds
+                    i += 1
+
+                if i >= number_of_events:
+                    break
+
+            seconds += rnd.expovariate(1 / mean_pause)
+
+    def fill(self, database: Database, number_of_events: int, days: int = 6) -> None:
+        """Store generated events into a database (see events)."""
+        database.store_events(self.events(number_of_events, days))
+
+    def __pick_routine(self, rnd: random.Random, now: datetime.time) -> List[str]:
+        """Pick a routine, preferring those whose preferred time is close to now.
+
+        The weights only change every 10 minutes, so they are accumulated once for each slot of the day.
+        """
+        slot = (now.hour * 60 + now.minute) // 10
+        try:
+            cumulative_weights = self._cumulative_weights[slot]
+        except KeyError:
+            weights = []
+            for preferred_time, _ in self._routines:
+                distance = abs(preferred_time.hour * 60 + preferred_time.minute - slot * 10)
+                distance = min(distance, 24 * 60 - distance)
+                weights.append(math.exp(-distance / 90) + .05)
+            cumulative_weights = list(itertools.accumulate(weights))
+            self._cumulative_weights[slot] = cumulative_weights
+        return rnd.choices(self._routines, cum_weights=cumulative_weights)[0][1]
+
+    @staticmethod
+    def __conditions(timestamp: datetime.datetime) -> FrozenSet[Condition]:
+        """Get the conditions at a time: the time of day and a daily temperature curve."""
+        hours = timestamp.hour + timestamp.minute / 60
+        temperature = 12 + 10 * math.sin((hours - 9) / 24 * 2 * math.pi) + (timestamp.toordinal() % 7 - 3)
+
+        time_of_day = TimeOfDayCondition.from_value(timestamp.time())
+        time_of_day.associated_item = _TIME_OF_DAY_ITEM
+        temperature_condition = TemperatureCondition.from_value(temperature)
+        temperature_condition.associated_item = _TEMPERATURE_ITEM
+        return frozenset({time_of_day, temperature_condition})
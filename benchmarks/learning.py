@@ -0,0 +1,196 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+
+# Builtin Imports
+import argparse
+import dataclasses
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Library Imports
+# […]
+
+# Project Imports
+from benchmarks.generator import HouseholdGenerator
+
+_logger = logging.getLogger(__name__)
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_LEARNING_INTERVAL = 7  # days
+_DAYS = 6  # the generated events lie within the last days, so they are learned for a day after generating
+
+
+def _peak_memory(who: int) -> Optional[int]:
+    """Get the peak resident memory (in KiB) of this process or its children."""
+    if resource is None:
+        return None
+    peak_memory = resource.getrusage(who).ru_maxrss
+    return peak_memory // 1024 if sys.platform == 'darwin' else peak_memory  # macOS reports bytes
+
+
+def _generate(number_of_events: int, number_of_groups: int, seed: int) -> Dict[str, Any]:
+    """Fill the database of the scenario in the current directory."""
+    # The config and the item list are read from the current directory on import.
+    from sharly.database.sqlite import SQLiteDatabase
+    from sharly.util.config import CONFIG
+
+    start = time.perf_counter()
+    database = SQLiteDatabase(CONFIG.database_name, clear=True, pragmas=CONFIG.database_pragmas)
+    HouseholdGenerator(number_of_groups, seed).fill(database, number_of_events, _DAYS)
+    database.disconnect()
+    return {'generate_seconds': time.perf_counter() - start}
+
+
+def _learn(workers: int) -> Dict[str, Any]:
+    """Learn the scenario in the current directory."""
+    from sharly.application.learn import LearnApplication
+    from sharly.database.sqlite import SQLiteDatabase
+    from sharly.util.config import CONFIG
+
+    start = time.perf_counter()
+    with LearnApplication(_LEARNING_INTERVAL, workers=workers) as app:
+        app.start(False, False, False)
+        statistics = app.pipeline.statistics
+    seconds = time.perf_counter() - start
+
+    # The throughput refers to the events, which were learned (the valid events of the interval).
+    database = SQLiteDatabase(CONFIG.database_name, clear=False, pragmas=CONFIG.database_pragmas)
+    learned_events = sum(1 for _ in database.iter_events(interval=_LEARNING_INTERVAL))
+    database.disconnect()
+
+    return {
+        'learn_seconds': seconds,
+        'learned_events': learned_events,
+        'peak_memory_kib': _peak_memory(resource.RUSAGE_SELF) if resource else None,
+        'workers_peak_memory_kib': _peak_memory(resource.RUSAGE_CHILDREN) if resource else None,
+        'stages': [dataclasses.asdict(stage_statistics) for stage_statistics in statistics],
+    }
+
+
+def _run_child(directory: str, *args: str) -> Dict[str, Any]:
+    """Run this module in a new process inside a scenario directory and get its result."""
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join(filter(None, [_ROOT, environment.get('PYTHONPATH')]))
+    process = subprocess.run([sys.executable, '-m', 'benchmarks.learning', *args], cwd=directory, env=environment,
+                             stdout=subprocess.PIPE, check=True, text=True)
+    return json.loads(process.stdout.splitlines()[-1])
+
+
+def run_scenario(directory: str, number_of_events: int, number_of_groups: int, seed: int, workers: int,
+                 regenerate: bool = False) -> Dict[str, Any]:
+    """Generate (if needed) and learn a scenario.
+
+    Each scenario runs in its own process, because the config and the item list are read from
+    the working directory on import. This also keeps the peak memory of the scenarios apart.
+
+    Parameters
+    ----------
+    directory
+        The directory of the scenario.
+    number_of_events
+        The number of events to generate.
+    number_of_groups
+        The number of groups of the household.
+    seed
+        The seed of the household.
+    workers
+        The number of processes to learn groups in parallel.
+    regenerate
+        Generate the database, even if it was generated before (it is also generated again, once its events
+        would drop out of the learning interval).
+
+    Returns
+    -------
+    The measurements of the scenario.
+    """
+    scenario = {'events': number_of_events, 'groups': number_of_groups, 'seed': seed}
+    scenario_filename = os.path.join(directory, 'scenario.json')
+
+    result: Dict[str, Any] = dict(scenario, workers=workers)
+    generated = False
+    if not regenerate and os.path.exists(scenario_filename):
+        with open(scenario_filename) as fp:
+            stored_scenario = json.load(fp)
+        # The timestamps are relative to the time of generating, but the learning interval is relative to now.
+        age = time.time() - stored_scenario.pop('generated', 0)
+        generated = stored_scenario == scenario and age < (_LEARNING_INTERVAL - _DAYS) * 24 * 60 * 60
+
+    if not generated:
+        _logger.info(f'Generating {number_of_events} events in {number_of_groups} groups.')
+        HouseholdGenerator(number_of_groups, seed).write_files(directory)
+        result.update(_run_child(directory, 'generate', str(number_of_events), str(number_of_groups), str(seed)))
+        with open(scenario_filename, 'w') as fp:
+            json.dump(dict(scenario, generated=time.time()), fp)
+
+    _logger.info(f'Learning {number_of_events} events in {number_of_groups} groups.')
+    result.update(_run_child(directory, 'learn', str(workers)))
+    result['events_per_second'] = result['learned_events'] / result['learn_seconds']
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark learning on synthetic households.')
+    parser.add_argument('-e', '--events', help='numbers of events', nargs='+', type=int,
+                        default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('-g', '--groups', help='numbers of groups', nargs='+', type=int, default=[1, 10, 50])
+    parser.add_argument('-s', '--seed', help='seed of the households', default=0, type=int)
+    parser.add_argument('-w', '--workers', help='number of processes to learn groups in parallel', default=1,
+                        type=int)
+    parser.add_argument('-d', '--directory', help='directory of the generated scenarios',
+                        default='benchmark_scenarios')
+    parser.add_argument('-o', '--output', help='JSON file of the results', default='benchmark_results.json')
+    parser.add_argument('-r', '--regenerate', help='generate the scenarios again', action='store_true')
+    parser.add_argument('-v', '--verbose', help='enable verbose output', action='store_true')
+    parser.add_argument('child', help=argparse.SUPPRESS, nargs='*')  # used to run a scenario in a new process
+    args = parser.parse_args()
+
+    if args.child:
+        command, *child_args = args.child
+        if command == 'generate':
+            print(json.dumps(_generate(*map(int, child_args))))
+        elif command == 'learn':
+            print(json.dumps(_learn(*map(int, child_args))))
+        else:
+            parser.error(f'Unknown command "{command}"!')
+        return
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    results = []
+    for number_of_events in args.events:
+        for number_of_groups in args.groups:
+            directory = os.path.join(args.directory, f'{number_of_events}_events_{number_of_groups}_groups')
+            result = run_scenario(os.path.abspath(directory), number_of_events, number_of_groups, args.seed,
+                                  args.workers, args.regenerate)
+            print(f'{number_of_events:>9} events {number_of_groups:>3} groups: {result["learn_seconds"]:8.2f}s '
+                  f'{result["events_per_second"]:10.0f} events/s, peak memory {result["peak_memory_kib"]} KiB')
+            results.append(result)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scenarios': results,
+    }
+    with open(args.output, 'w') as fp:
+        json.dump(report, fp, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+    from sharly.model.condition import Condition
+
+# Builtin Imports
+import argparse
+import datetime
+import json
+import logging
+import platform
+import sys
+import timeit
+import tracemalloc
+
+# Library Imports
+# […]
+
+# Project Imports
+from sharly.model.compact_event_sequence import CompactEventSequence
+from sharly.model.condition.temperature import TemperatureCondition
+from sharly.model.condition.time_of_day import TimeOfDayCondition
+from sharly.model.event import Event, Item
+from sharly.model.event_sequence import EventSequence
+
+_logger = logging.getLogger(__name__)
+
+_SIZES = (4, 16, 64)
+_CONDITION_COUNTS = (0, 2, 8)
+_EVENT_DELAY = 60
+_WEIGHT_THRESHOLD = 4
+
+
+def _conditions(count: int) -> FrozenSet[Condition]:
+    """Get a set of conditions (alternating time of day and temperature conditions of different items)."""
+    conditions = set()
+    for i in range(count):
+        if i % 2:
+            condition = TemperatureCondition.from_value(18)
+        else:
+            condition = TimeOfDayCondition.from_value(datetime.time(hour=9))
+        condition.associated_item = f'condition{i}'
+        conditions.add(condition)
+    return frozenset(conditions)
+
+
+def _events(size: int, conditions: FrozenSet[Condition], offset: int = 0) -> List[Event]:
+    """Get events of different items, which are one second apart."""
+    start = datetime.datetime(2021, 1, 1)
+    return [
+        Event(Item(f'item{i + offset}', 'OFF', 'ON'), start + datetime.timedelta(seconds=i), conditions)
+        for i in range(size)
+    ]
+
+
+def _event_sequence(events: Iterable[Event]) -> EventSequence:
+    event_sequence = EventSequence()
+    for event in events:
+        event_sequence.add_event(event, _EVENT_DELAY)
+    return event_sequence
+
+
+def _operations(size: int, condition_count: int) -> Dict[str, Callable[[], Any]]:
+    """Get the benchmarked operations on event sequences of a size with a number of conditions."""
+    conditions = _conditions(condition_count)
+    events = _events(size, conditions)
+    event_sequence = _event_sequence(events)
+    equal_sequence = _event_sequence(events)
+    partial_sequence = _event_sequence(events[:size // 2])
+    other_sequence = _event_sequence(events[:size // 2] + _events(size - size // 2, conditions, offset=size))
+
+    return {
+        'add_event': lambda: _event_sequence(events),
+        'eq': lambda: event_sequence == equal_sequence,
+        'contains': lambda: partial_sequence in event_sequence,
+        'add': lambda: event_sequence + equal_sequence,
+        'is_anomaly': lambda: event_sequence.is_anomaly(equal_sequence, _WEIGHT_THRESHOLD),
+        'similarity_score': lambda: event_sequence.get_similarity_score(other_sequence),
+    }
+
+
+def measure(repeat: int = 5) -> Dict[str, float]:
+    """Measure all operations.
+
+    Parameters
+    ----------
+    repeat
+        The number of measurements of each operation, the fastest one is used.
+
+    Returns
+    -------
+    The time (in µs) of each operation by its name (operation/size/conditions).
+    """
+    results = {}
+    for size in _SIZES:
+        for condition_count in _CONDITION_COUNTS:
+            for name, operation in _operations(size, condition_count).items():
+                timer = timeit.Timer(operation)
+                number, _ = timer.autorange()
+                seconds = min(timer.repeat(repeat, number)) / number
+                results[f'{name}/{size}/{condition_count}'] = seconds * 1_000_000
+    return results
+
+
+def _compact_event_sequence(event_sequence: EventSequence) -> CompactEventSequence:
+    """Get a compact event sequence, whose index and nodes were already used (like after merging it)."""
+    compact_event_sequence = CompactEventSequence.from_event_sequence(event_sequence)
+    compact_event_sequence.occurrence(compact_event_sequence.root)
+    compact_event_sequence.nodes
+    return compact_event_sequence
+
+
+def _allocated(create: Callable[[], Any]) -> int:
+    """Get the memory (in bytes), which is still allocated by create while its result is alive."""
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        result = create()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return after - before
+
+
+def measure_memory(number: int = 100) -> Dict[str, Tuple[float, float]]:
+    """Measure the memory of event sequences and compact event sequences.
+
+    The events are created before and shared by all sequences (like the events of a loaded library),
+    so only the structures of the sequences are measured (including the index and the nodes of compact ones).
+
+    Parameters
+    ----------
+    number
+        The number of sequences of each size (the memory is averaged over them).
+
+    Returns
+    -------
+    The memory (in bytes) of an event sequence and of a compact event sequence by size/conditions.
+    """
+    results = {}
+    for size in _SIZES:
+        for condition_count in _CONDITION_COUNTS:
+            events = _events(size, _conditions(condition_count))
+            event_sequences = [_event_sequence(events) for _ in range(number)]
+            graph_bytes = _allocated(lambda: [_event_sequence(events) for _ in range(number)])
+            compact_bytes = _allocated(lambda: [_compact_event_sequence(event_sequence)
+                                                for event_sequence in event_sequences])
+            results[f'{size}/{condition_count}'] = (graph_bytes / number, compact_bytes / number)
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """Compare measurements against a baseline.
+
+    Parameters
+    ----------
+    results
+        The current measurements.
+    baseline
+        The measurements to compare against.
+    threshold
+        The allowed relative slowdown (e.g. 0.1 = 10%).
+
+    Returns
+    -------
+    The names of the operations, which are slower than allowed.
+    """
+    slower = []
+    for name, microseconds in results.items():
+        try:
+            ratio = microseconds / baseline[name]
+        except (KeyError, ZeroDivisionError):
+            continue
+
+        flag = ''
+        if ratio > 1 + threshold:
+            slower.append(name)
+            flag = '  <- slower'
+        print(f'{name:<28} {baseline[name]:>12.2f} {microseconds:>12.2f} {ratio:>8.2f}x{flag}')
+    return slower
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the operations of event sequences.')
+    parser.add_argument('-s', '--save', help='save the measurements as baseline into a JSON file')
+    parser.add_argument('-c', '--compare', help='compare the measurements against a baseline JSON file')
+    parser.add_argument('-t', '--threshold', help='allowed relative slowdown before failing (default = 0.1)',
+                        default=.1, type=float)
+    parser.add_argument('-r', '--repeat', help='number of measurements of each operation', default=5, type=int)
+    parser.add_argument('-m', '--memory', help='measure the memory of compact event sequences instead',
+                        action='store_true')
+    args = parser.parse_args()
+
+    if args.memory:
+        print(f'{"size/conditions":<16} {"graph bytes":>12} {"compact bytes":>14} {"ratio":>9}')
+        for name, (graph_bytes, compact_bytes) in measure_memory().items():
+            print(f'{name:<16} {graph_bytes:>12.0f} {compact_bytes:>14.0f} {graph_bytes / compact_bytes:>8.1f}x')
+        return
+
+    results = measure(args.repeat)
+
+    if args.save:
+        with open(args.save, 'w') as fp:
+            json.dump({'python': platform.python_version(), 'results': results}, fp, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)['results']
+
+        print(f'{"operation/size/conditions":<28} {"baseline µs":>12} {"current µs":>12} {"ratio":>9}')
+        slower = compare(results, baseline, args.threshold)
+        if slower:
+            print(f'{len(slower)} operations are more than {args.threshold:.0%} slower than the baseline!')
+            sys.exit(1)
+    elif not args.save:
+        for name, microseconds in results.items():
+            print(f'{name:<28} {microseconds:>12.2f} µs')
+
+
+if __name__ == '__main__':
+    main()
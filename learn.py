@@ -9,6 +9,9 @@ if TYPE_CHECKING:
 
 # Builtin Imports
 import argparse
+import contextlib
+import cProfile
+import json
 import logging
 
 # Library Imports
@@ -17,6 +20,7 @@ import logging
 # Project Imports
 from sharly.application.learn import LearnApplication
 from sharly.util.logging import setup_logger
+from sharly.util.metrics import METRICS, StackSampler
 
 _logger = logging.getLogger(__name__)
 
@@ -29,12 +33,47 @@ def main() -> None:
     parser.add_argument('-vi', '--visualize', help='visualize final event sequences', action='store_true')
     parser.add_argument('-vz', '--visualize_zero_edges', help='visualize zero weight edges', action='store_true')
     parser.add_argument('-p', '--plot', help='plot learning graphs', action='store_true')
+    parser.add_argument('-ws', '--warm_start', help='start from the previously learned event delays',
+                        action='store_true')
+    parser.add_argument('-w', '--workers', help='number of processes to learn groups in parallel', default=1,
+                        type=int)
+    parser.add_argument('-inc', '--incremental', help='continue learning after the last processed events '
+                        '(the last event sequence is held back until a later run)', action='store_true')
+    parser.add_argument('-pr', '--profile', help='write counters and timings of each group into a JSON file')
+    parser.add_argument('-pd', '--profile_dump', help='write a profile of the main process into a file')
+    parser.add_argument('-pf', '--profile_format', help='format of the profile dump (default = cprofile)',
+                        choices=['cprofile', 'collapsed'], default='cprofile')
     args = parser.parse_args()
 
     setup_logger(args.verbose, args.debug)
 
-    with LearnApplication(args.interval) as app:
-        app.start(args.visualize, args.visualize_zero_edges, args.plot)
+    if args.profile:
+        METRICS.enable()
+
+    if not args.profile_dump:
+        profiler = contextlib.nullcontext()
+    elif args.profile_format == 'collapsed':
+        profiler = StackSampler()
+    else:
+        profiler = cProfile.Profile()
+
+    with LearnApplication(args.interval, args.warm_start, args.incremental, args.workers) as app:
+        with profiler:
+            app.start(args.visualize, args.visualize_zero_edges, args.plot)
+
+        print(f'{"stage":<12} {"time [s]":>10} {"items in":>12} {"items out":>12}')
+        for statistics in app.pipeline.statistics:
+            print(f'{statistics.name:<12} {statistics.seconds:>10.3f} {statistics.items_in:>12} '
+                  f'{statistics.items_out:>12}')
+
+    if args.profile:
+        with open(args.profile, 'w') as fp:
+            json.dump(METRICS.report(), fp, indent=2)
+
+    if isinstance(profiler, cProfile.Profile):
+        profiler.dump_stats(args.profile_dump)
+    elif isinstance(profiler, StackSampler):
+        profiler.dump(args.profile_dump)
 
 
 if __name__ == '__main__':
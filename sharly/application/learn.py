@@ -6,192 +6,128 @@ from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from typing import *
-    from sharly.model.event import Event
+    from sharly.database import Database
+    from sharly.learning.pipeline import Pipeline, StageStatistics
 
 # Builtin Imports
+import concurrent.futures
 import logging
-import os
 
 # Library Imports
-import matplotlib.pyplot as plt
+# […]
 
 # Project Imports
 from sharly.application import Application
 from sharly.database.factory import DatabaseFactory
-from sharly.model.event_sequence import EventSequence
+from sharly.database.measured import MeasuredDatabase
+from sharly.learning.stages import GroupContext, GroupResult, GroupTask, learning_pipeline
 from sharly.util.config import CONFIG
 from sharly.util.item_list import ITEM_LIST
+from sharly.util.metrics import METRICS
 
 _logger = logging.getLogger(__name__)
 
+# Database and pipeline of a worker process (see _init_worker).
+_worker_database: Optional[Database] = None
+_worker_pipeline: Optional[Pipeline] = None
+
+
+def _open_database() -> Database:
+    # A memory database opened from the config would be empty (and another one in each worker process),
+    # it has to be restored from another database instead (see MemoryDatabase.restore).
+    if CONFIG.database_engine == 'memory':
+        error_message = 'The memory database engine cannot be used for learning, there would be no events to learn!'
+        _logger.error(error_message)
+        raise RuntimeError(error_message)
+
+    database = DatabaseFactory.get_database(
+        CONFIG.database_engine,
+        username=CONFIG.database_user, password=CONFIG.database_password,
+        host=CONFIG.database_host, port=CONFIG.database_port,
+        database_name=CONFIG.database_name, clear=False, pragmas=CONFIG.database_pragmas
+    )
+    if METRICS.enabled:
+        database = MeasuredDatabase(database)
+    return database
+
+
+def _init_worker(pipeline: Pipeline, profile: bool) -> None:
+    """Open the database connection of a worker process."""
+    global _worker_database, _worker_pipeline
+    if profile:
+        METRICS.enable()
+    _worker_database = _open_database()
+    _worker_pipeline = pipeline
+
+
+def _learn_group(task: GroupTask, stop: Optional[str]
+                 ) -> Tuple[Optional[GroupResult], List[StageStatistics], Dict[str, Dict[str, float]]]:
+    """Run the stages before the first writing stage (stop) inside a worker process."""
+    _worker_pipeline.clear_statistics()
+    with METRICS.group(task.group):
+        result = _worker_pipeline.run(GroupContext(_worker_database, task), stop=stop)
+    return result, _worker_pipeline.statistics, METRICS.pop(task.group)
+
 
 class LearnApplication(Application):
-    def __init__(self, learning_interval: int) -> None:
+    def __init__(self, learning_interval: int, warm_start: bool = False, incremental: bool = False,
+                 workers: int = 1) -> None:
         self._learning_interval = learning_interval
-        self._database = DatabaseFactory.get_database(
-            CONFIG.database_engine,
-            username=CONFIG.database_user, password=CONFIG.database_password,
-            host=CONFIG.database_host, port=CONFIG.database_port,
-            database_name=CONFIG.database_name, clear=False
-        )
-        self._database.clear_learned(CONFIG.database_name)
-
-    def __calculate_event_delay(self, events: List[Event], frame: Dict[int, int]) -> int:
-        """Calculate the time (in sec) allowed to pass between two events, which fits best to represent user behaviour.
-
-        This method tries to find a parameter T, which separates the event sequences
-        in the best way. To do so, this method iteratively increases T until
-        the found sequences become stable.
-
-        Parameters
-        ----------
-        events
-            List of events to use.
-        frame
-            Structure to store data points.
-
-        Returns
-        -------
-        The best event delay in seconds.
-        """
-        t = CONFIG.t_init
-        while True:
-            stable, new_t = self.__sequences_stable(events, t, frame)
-            if stable:
-                break
-            t = new_t
-        return t
-
-    def __sequences_stable(self, events: List[Event], t: int, frame: Dict[int, int]) -> Tuple[bool, int]:
-        """Check if all sequences are stable with given time parameter.
-
-        Sequences are specified as stable if the amount of event-pairs does not
-        change more then N for all T'. N is a fixed preset parameter (see config).
-        T' is a value which is iterated from T to T + T_inc_stable.
-
-        Parameters
-        ----------
-        events
-            List of events to use.
-        t
-            Time which is allowed to pass between two events to belong to the same sequence.
-        frame
-            Structure to store data points.
-
-        Returns
-        -------
-        True, if sequences are stable, False otherwise plus the new T value.
-        """
-        _logger.debug(f'-> Checking if sequences are stable with t = {t}:')
-        for t_ in range(t, t + CONFIG.t_inc_stable, CONFIG.t_inc):
-            number_of_pairs_now = self.__number_of_pairs(events, t_)
-            number_of_pairs_future = self.__number_of_pairs(events, t_ + CONFIG.t_inc)
-            if t_ not in frame:
-                frame[t_] = number_of_pairs_now
-
-            if abs(number_of_pairs_now - number_of_pairs_future) > CONFIG.n:
-                _logger.debug(f'   No, found unstable pair-increment at t = {t_}')
-                return False, t_ + CONFIG.t_inc
-
-        _logger.debug(f'   Yes, stable')
-        return True, 0
-
-    def __number_of_pairs(self, events: List[Event], t: int) -> int:  # List[int]:
-        """Calculate the number of pairs of events over all event sequences.
-
-        Parameters
-        ----------
-        events
-            List of events to use.
-        t
-            Time which is allowed to pass between two events to belong to the same sequence.
-
-        Returns
-        -------
-        List of number of event-pairs for all sequences.
-        """
-        number_of_pairs = 0  # []
-        for event_sequence in self.__generate_event_sequences(events, t):
-            number_of_pairs += event_sequence.size()
-        return number_of_pairs
-
-    @staticmethod
-    def __generate_event_sequences(events: List[Event], event_delay: int) -> Generator[EventSequence, None, None]:
-        """Generate event sequences.
-
-        Parameters
-        ----------
-        events
-            List of events to use.
-        event_delay
-            Time which is allowed to pass between two events to belong to the same sequence.
-
-        Returns
-        -------
-        Generated sequences.
-        """
-        event_sequence = EventSequence()
-        previous = events[0]
-        event_sequence.add_event(previous, event_delay)
-
-        for event in events[1:]:
-            if (event == previous) and ((event.timestamp - previous.timestamp).total_seconds() < CONFIG.t_inc):
-                previous = event
-                continue
-
-            if not event_sequence.add_event(event, event_delay):
-                yield event_sequence.copy()
-                event_sequence.clear()
-                event_sequence.add_event(event, event_delay)
-
-            previous = event
-
-        yield event_sequence
+        self._incremental = incremental
+        self._workers = workers
+        self._database = _open_database()
+        self._pipeline = learning_pipeline()
+
+        # The previous event delays have to be read before they get cleared.
+        self._previous_event_delays: Dict[str, int] = {}
+        if warm_start:
+            self._previous_event_delays = {group: self._database.get_event_delay(group) for group in ITEM_LIST.groups}
+
+        # Incremental runs continue after the high-water mark of each group. Without any mark,
+        # the learned data does not belong to an incremental run and has to be cleared as well.
+        self._high_water_marks: Dict[str, int] = {}
+        if incremental:
+            self._high_water_marks = {group: self._database.get_high_water_mark(group) for group in ITEM_LIST.groups}
+
+        if not any(self._high_water_marks.values()):
+            self._high_water_marks = {}
+            self._database.clear_learned(CONFIG.database_name)
+
+    @property
+    def pipeline(self) -> Pipeline:
+        """The stages to learn each group with (stages may be replaced or removed before start)."""
+        return self._pipeline
 
     def start(self, visualize: bool, visualize_zero_edges: bool, plot: bool) -> None:
         _logger.info(f'Learning started with an interval of {self._learning_interval} days.')
-        for group in ITEM_LIST.groups:
-            events = self._database.get_events(group, self._learning_interval)
-            if not events:
-                _logger.info(f'No events found for group "{group}" in the last {self._learning_interval} days - skip.')
-                continue
-
-            frame: Dict[int, int] = {}
-            event_delay = self.__calculate_event_delay(events, frame)
-            if plot:
-                if os.path.exists(group + '_data.png'):
-                    os.remove(group + '_data.png')
-                data = sorted(frame.items())
-                x, y = zip(*data)
-                plt.plot(x, y, label=group)
-                plt.legend()
-                plt.savefig(group + '_data.png')
-                plt.close()
-
-            self._database.store_event_delay(group, event_delay)
-            _logger.info(f'Calculated best event delay for group "{group}": {event_delay}s')
-
-            event_sequences: List[EventSequence] = []
-            i = 0
-            for event_sequence in self.__generate_event_sequences(events, event_delay):
-                for j in range(len(event_sequences)):
-                    equal = (event_sequence == event_sequences[j])
-                    if equal:
-                        event_sequences[j] += event_sequence
-                        break
-                else:
-                    event_sequences.append(event_sequence)
-
-                i += 1
-
-            _logger.info(f'Generated {i} event sequences for group "{group}".')
-            _logger.info(f'Merged down to {len(event_sequences)} event sequences for group "{group}".')
-
-            _logger.info(f'Storing event sequences for group "{group}".')
-            for i, event_sequence in enumerate(event_sequences):
-                self._database.store_event_sequence(event_sequence, group)
-                if visualize:
-                    event_sequence.visualize(f'{group}/{i}', visualize_zero_edges)
+        tasks = [
+            GroupTask(group, self._learning_interval, self._previous_event_delays.get(group, 0),
+                      self._high_water_marks.get(group, 0), self._incremental)
+            for group in ITEM_LIST.groups
+        ]
+
+        if self._workers <= 1:
+            for task in tasks:
+                with METRICS.group(task.group):
+                    self._pipeline.run(GroupContext(self._database, task, visualize, visualize_zero_edges, plot))
+            return
+
+        # Groups are learned in parallel, but only this process writes into the database
+        # (from the first writing stage on, if there is none, the workers run the whole pipeline).
+        writing_stage = self._pipeline.first_writing_stage
+        _logger.info(f'Learning {len(tasks)} groups with {self._workers} workers.')
+        with concurrent.futures.ProcessPoolExecutor(self._workers, initializer=_init_worker,
+                                                    initargs=(self._pipeline, METRICS.enabled)) as executor:
+            futures = {executor.submit(_learn_group, task, writing_stage): task for task in tasks}
+            for future in concurrent.futures.as_completed(futures):
+                result, statistics, metrics = future.result()
+                self._pipeline.add_statistics(statistics)
+                METRICS.merge(metrics)
+                if result is not None and writing_stage is not None:
+                    task = futures[future]
+                    with METRICS.group(task.group):
+                        context = GroupContext(self._database, task, visualize, visualize_zero_edges, plot)
+                        self._pipeline.run(context, result, start=writing_stage)
 
     def stop(self) -> None:
         self._database.disconnect()
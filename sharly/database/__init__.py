@@ -8,25 +8,57 @@ if TYPE_CHECKING:
     from typing import *
     from sharly.model.condition import Condition
     from sharly.model.event import Event
-    from sharly.model.event_sequence import EventSequence
 
 # Builtin Imports
 import abc
+import functools
 import logging
+import threading
 
 # Library Imports
 # […]
 
 # Project Imports
-# […]
+from sharly.model.compact_event_sequence import CompactEventSequence
+from sharly.model.event_sequence import EventSequence
 
 
 _logger = logging.getLogger(__name__)
 
 
+def writes(method: Callable[..., Any]) -> Callable[..., Any]:
+    """Decorate a method of a database, which writes.
+
+    The method runs on the writer connection and only one thread at a time writes,
+    inside the method (and the methods it calls) the connection property is the writer connection.
+    """
+    @functools.wraps(method)
+    def wrapper(self: Database, *args: Any, **kwargs: Any) -> Any:
+        with self._writer_lock:
+            self._local.writing = getattr(self._local, 'writing', 0) + 1
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self._local.writing -= 1
+    return wrapper
+
+
 class Database(abc.ABC):
+    """A database, which can be used by many threads.
+
+    Each thread reads on its own connection, which is opened on first use. All threads write on a single
+    connection, one at a time (see writes). Engines have to allow reading next to the writer (e.g. SQLite in WAL mode).
+    The reading connections are registered by thread, so disconnect closes the connections of all threads
+    and a thread can release its connection early (see release).
+    """
     def __init__(self, *args: Any, **kwargs: Any) -> None:
-        self._connection = self.connect(*args, **kwargs)
+        self._connect_args = args
+        self._connect_kwargs = kwargs
+        self._local = threading.local()
+        self._writer_lock = threading.RLock()
+        self._connections_lock = threading.Lock()
+        self._connections: Dict[int, Any] = {}  # thread ident -> reading connection
+        self._connection = self.connect(*args, **kwargs)  # the writer connection
 
     def __repr__(self) -> str:
         return f'{self.__class__.__name__}'
@@ -34,7 +66,28 @@ class Database(abc.ABC):
     @property
     @abc.abstractmethod
     def connection(self) -> Any:
-        return self._connection
+        """The connection of the calling thread (the writer connection inside methods, which write)."""
+        if getattr(self._local, 'writing', 0):
+            return self._connection
+
+        # The ident of an ended thread is reused by a new one, so the registry does not grow beyond the live threads.
+        ident = threading.get_ident()
+        connection = self._connections.get(ident)
+        if connection is None:
+            connection = self.connect(*self._connect_args, **self._connect_kwargs)
+            with self._connections_lock:
+                self._connections[ident] = connection
+        return connection
+
+    def release(self) -> None:
+        """Close the reading connection of the calling thread, e.g. before the thread ends.
+
+        The connection is opened again, if the thread reads afterwards.
+        """
+        with self._connections_lock:
+            connection = self._connections.pop(threading.get_ident(), None)
+        if connection is not None:
+            connection.close()
 
     @abc.abstractmethod
     def connect(self, *args: Any, **kwargs: Any) -> Any:
@@ -105,8 +158,54 @@ class Database(abc.ABC):
             The event to store into the database.
         """
 
+    def store_events(self, events: Iterable[Event], batch_size: int = 1000) -> None:
+        """Store many events into the database (e.g. to import the history of openHAB).
+
+        Engines with transactions store each batch of events in a single transaction,
+        this implementation stores the events one by one.
+
+        Parameters
+        ----------
+        events
+            The events to store into the database (in order).
+        batch_size
+            The number of events stored at once.
+        """
+        for event in events:
+            self.store_event(event)
+
     @abc.abstractmethod
-    def get_events(self, group: Optional[str] = None, interval: Optional[int] = None) -> List[Event]:
+    def iter_events(self, group: Optional[str] = None, interval: Optional[int] = None,
+                    after: Optional[int] = None) -> Iterator[Event]:
+        """Iterate over all events from the last interval days for a specific group (ordered by id).
+
+        The events are read lazily, so only the current event has to be kept in memory.
+
+        Parameters
+        ----------
+        group
+            Get only events of a specific group.
+        interval
+            Get only events of the last interval days (default is all).
+        after
+            Get only events with an id greater than after (default is all).
+
+        Returns
+        -------
+        Iterator over the matching events.
+        """
+
+    @abc.abstractmethod
+    def get_number_of_events(self) -> int:
+        """Get the number of all stored events (not only the valid ones, see ITEM_LIST).
+
+        Returns
+        -------
+        The number of events or -1 if something went wrong.
+        """
+
+    def get_events(self, group: Optional[str] = None, interval: Optional[int] = None,
+                   after: Optional[int] = None) -> List[Event]:
         """Get all events from the last interval days for a specific group.
 
         Parameters
@@ -115,11 +214,14 @@ class Database(abc.ABC):
             Get only events of a specific group.
         interval
             Get only events of the last interval days (default is all).
+        after
+            Get only events with an id greater than after (default is all).
 
         Returns
         -------
         List of matching events.
         """
+        return list(self.iter_events(group, interval, after))
 
     @abc.abstractmethod
     def store_event_sequence(self, event_sequence: EventSequence, group: str) -> None:
@@ -133,6 +235,46 @@ class Database(abc.ABC):
             The corresponding group.
         """
 
+    @abc.abstractmethod
+    def update_event_sequence(self, event_sequence: EventSequence) -> None:
+        """Update the occurrences and weights of a stored event sequence.
+
+        Parameters
+        ----------
+        event_sequence
+            The event sequence to update (requires an id).
+        """
+
+    def store_event_sequences(self, group: str, event_sequences: Iterable[EventSequence],
+                              changed_event_sequences: Iterable[EventSequence] = (), event_delay: Optional[int] = None,
+                              high_water_mark: Optional[int] = None) -> None:
+        """Store the learned data of a group at once.
+
+        Engines with transactions store everything in a single transaction,
+        this implementation stores the parts one by one.
+
+        Parameters
+        ----------
+        group
+            The corresponding group.
+        event_sequences
+            The new event sequences to store.
+        changed_event_sequences
+            The stored event sequences to update (see update_event_sequence).
+        event_delay
+            The event delay of the group to store (if any).
+        high_water_mark
+            The id of the last processed event of the group to store (if any).
+        """
+        if event_delay is not None:
+            self.store_event_delay(group, event_delay)
+        for event_sequence in changed_event_sequences:
+            self.update_event_sequence(event_sequence)
+        for event_sequence in event_sequences:
+            self.store_event_sequence(event_sequence, group)
+        if high_water_mark is not None:
+            self.store_high_water_mark(group, high_water_mark)
+
     @abc.abstractmethod
     def store_event_delay(self, group: str, value: int) -> None:
         """Store the event delay for a given group.
@@ -153,15 +295,49 @@ class Database(abc.ABC):
         ----------
         group
             The associated group.
+
+        Returns
+        -------
+        The event delay (0, if no event delay is stored for the group).
+        """
+
+    @abc.abstractmethod
+    def store_high_water_mark(self, group: str, event_id: int) -> None:
+        """Store the id of the last event, which was processed for a given group.
+
+        Parameters
+        ----------
+        group
+            The group associated to the high-water mark.
+        event_id
+            The id of the last processed event.
+        """
+
+    @abc.abstractmethod
+    def get_high_water_mark(self, group: str) -> int:
+        """Get the id of the last event, which was processed for a given group.
+
+        Parameters
+        ----------
+        group
+            The associated group.
+
+        Returns
+        -------
+        The id of the last processed event (0, if no event was processed yet).
         """
+
     @abc.abstractmethod
-    def get_event_sequences(self, group: str) -> Dict[FrozenSet[Condition], List[EventSequence]]:
+    def get_event_sequences(self, group: str, compact: bool = False
+                            ) -> Dict[FrozenSet[Condition], List[Union[EventSequence, CompactEventSequence]]]:
         """Get all event sequences for a specific group.
 
         Parameters
         ----------
         group
             The associated group.
+        compact
+            Get CompactEventSequences instead of EventSequences, e.g. for large libraries which are only compared.
         """
 
     @abc.abstractmethod
@@ -173,3 +349,37 @@ class Database(abc.ABC):
         database_name
             The name of the database.
         """
+
+    @staticmethod
+    def _event_sequence_data(event_sequence: EventSequence, event_sequence_id: int) -> List[Tuple[int, ...]]:
+        """Convert an event sequence into rows (event_sequence_id, event_u_id, event_u_occurrence,
+        event_v_id, event_v_occurrence, weight)."""
+        data = []
+        for event_u, event_v, d in event_sequence.edges(data=True):
+            event_u_o = event_sequence.nodes[event_u]['occurrence']
+            event_v_o = event_sequence.nodes[event_v]['occurrence']
+            data.append((event_sequence_id, event_u.id, event_u_o, event_v.id, event_v_o, d['weight']))
+        return data
+
+    @staticmethod
+    def _event_sequence(event_sequence_id: int, rows: List[Tuple[Event, int, Event, int, int]], compact: bool
+                        ) -> Union[EventSequence, CompactEventSequence]:
+        """Create an event sequence from rows (event u, occurrence of u, event v, occurrence of v, weight)."""
+        if not compact:
+            event_sequence = EventSequence(event_sequence_id)
+            for event_u, euo, event_v, evo, w in rows:
+                event_sequence.add_node(event_u, occurrence=euo)
+                event_sequence.add_node(event_v, occurrence=evo)
+                event_sequence.add_edge(event_u, event_v, weight=w)
+            return event_sequence
+
+        index: Dict[Event, int] = {}
+        occurrences: List[int] = []
+        edges = []
+        for event_u, euo, event_v, evo, w in rows:
+            for event, occurrence in ((event_u, euo), (event_v, evo)):
+                if event not in index:
+                    index[event] = len(occurrences)
+                    occurrences.append(occurrence)
+            edges.append((index[event_u], index[event_v], w))
+        return CompactEventSequence(list(index), occurrences, edges, event_sequence_id)
@@ -0,0 +1,464 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+    from sharly.model.compact_event_sequence import CompactEventSequence
+    from sharly.model.event_sequence import EventSequence
+
+# Builtin Imports
+import dataclasses
+import datetime
+import itertools
+import json
+import logging
+import os
+import shutil
+
+# Library Imports
+import numpy
+
+# Project Imports
+from sharly.database import Database, writes
+from sharly.model.condition import Condition
+from sharly.model.event import Event, Item
+from sharly.util.item_list import ITEM_LIST
+
+_logger = logging.getLogger(__name__)
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+# The columns of the events (one file each), the id of an event is its row + 1.
+_COLUMNS = {
+    'timestamps': numpy.int64,  # microseconds since the epoch
+    'items': numpy.int32,  # ids of the item names
+    'old_states': numpy.int32,  # ids of the states
+    'new_states': numpy.int32,
+    'conditions': numpy.int32,  # ids of the condition sets
+}
+
+
+@dataclasses.dataclass
+class _Columns:
+    """The open files of a columnar database and the data, which is kept in memory."""
+    directory: str
+    number_of_events: int = 0
+    time_ordered: bool = True  # the timestamps are ascending, so intervals are found by binary search
+    maps: Dict[str, numpy.ndarray] = dataclasses.field(default_factory=dict)  # the mapped columns
+
+    # Dictionaries of the strings (the id of a string is its index)
+    item_names: List[str] = dataclasses.field(default_factory=list)
+    item_ids: Dict[str, int] = dataclasses.field(default_factory=dict)
+    states: List[str] = dataclasses.field(default_factory=list)
+    state_ids: Dict[str, int] = dataclasses.field(default_factory=dict)
+
+    # Interned condition sets
+    conditions: Dict[int, FrozenSet[Condition]] = dataclasses.field(default_factory=dict)
+    conditions_ids: Dict[FrozenSet[Condition], int] = dataclasses.field(default_factory=dict)
+
+    # The learned data (see ColumnarDatabase.__journal)
+    event_sequences: Dict[str, Dict[int, List[Tuple[int, ...]]]] = dataclasses.field(default_factory=dict)
+    event_sequence_groups: Dict[int, str] = dataclasses.field(default_factory=dict)
+    last_event_sequence_id: int = 0
+    event_delays: Dict[str, int] = dataclasses.field(default_factory=dict)
+    high_water_marks: Dict[str, int] = dataclasses.field(default_factory=dict)
+
+    def path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+
+class ColumnarDatabase(Database):
+    """A database, which stores the events in append-only columnar files, which are memory-mapped for reading.
+
+    The item names and states are dictionary encoded and the timestamps are stored as integers, so an interval of
+    events is a slice of the mapped columns (see get_columns) and only the returned events are decoded.
+    The dictionaries, the condition sets and the learned data are small, they are appended to JSON lines files
+    and kept in memory.
+    """
+    def __init__(self, database_name: str, clear: bool, **_kwargs: Any) -> None:
+        directory = f'{database_name}.columns'
+        if clear:
+            shutil.rmtree(directory, ignore_errors=True)
+            _logger.info(f'Cleared {self}.')
+        super().__init__(directory=directory)
+
+    @property
+    def connection(self) -> _Columns:
+        # The files are shared by all threads, the columns are mapped read-only.
+        return self._connection
+
+    def connect(self, directory: str) -> _Columns:
+        try:
+            os.makedirs(directory, exist_ok=True)
+            columns = _Columns(directory)
+            for line in self.__read_lines(columns.path('item_names.jsonl')):
+                columns.item_ids[line] = len(columns.item_names)
+                columns.item_names.append(line)
+            for line in self.__read_lines(columns.path('states.jsonl')):
+                columns.state_ids[line] = len(columns.states)
+                columns.states.append(line)
+            for i, rows in enumerate(self.__read_lines(columns.path('conditions.jsonl')), 1):
+                conditions = frozenset(self.__condition(*row) for row in rows)
+                columns.conditions[i] = conditions
+                columns.conditions_ids.setdefault(conditions, i)
+            for record in self.__read_lines(columns.path('learned.jsonl')):
+                self.__apply(columns, record)
+
+            # An interrupted append may have left some columns longer than others.
+            sizes = {}
+            for name, dtype in _COLUMNS.items():
+                filename = columns.path(f'{name}.bin')
+                with open(filename, 'ab'):
+                    pass
+                sizes[name] = os.path.getsize(filename) // numpy.dtype(dtype).itemsize
+            columns.number_of_events = min(sizes.values())
+            for name, dtype in _COLUMNS.items():
+                if sizes[name] != columns.number_of_events:
+                    _logger.warning(f'Truncated column "{name}" of {self} to {columns.number_of_events} events.')
+                    os.truncate(columns.path(f'{name}.bin'), columns.number_of_events * numpy.dtype(dtype).itemsize)
+        except OSError:
+            _logger.exception(f'Failed connecting to {self}!')
+            raise
+
+        timestamps = self.__column(columns, 'timestamps')
+        columns.time_ordered = bool(numpy.all(timestamps[1:] >= timestamps[:-1]))
+        _logger.info(f'Connected to {self}.')
+        return columns
+
+    def disconnect(self) -> None:
+        self.connection.maps.clear()
+
+    @staticmethod
+    def __read_lines(filename: str) -> Generator[Any, None, None]:
+        """Read the JSON values of a JSON lines file (nothing, if it does not exist).
+
+        Each value is appended with its line break, so a last line without one was not written completely
+        (e.g. the append was interrupted). It is removed from the file.
+        """
+        try:
+            with open(filename, 'rb') as fp:
+                data = fp.read()
+        except FileNotFoundError:
+            return
+
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            _logger.warning(f'Removed an incomplete last line ({len(data) - end} bytes) from "{filename}".')
+            os.truncate(filename, end)
+
+        for line in data[:end].splitlines():
+            if line.strip():
+                yield json.loads(line)
+
+    @staticmethod
+    def __append_lines(filename: str, values: Iterable[Any]) -> None:
+        with open(filename, 'a') as fp:
+            fp.writelines(json.dumps(value) + '\n' for value in values)
+
+    @staticmethod
+    def __condition(condition_type: int, condition_value: int, item_name: Optional[str]) -> Condition:
+        condition = Condition.Type(condition_type).to_class().from_enum(condition_value)
+        if item_name is not None:
+            condition.associated_item = item_name
+        return condition
+
+    @writes
+    def store_conditions(self, conditions: FrozenSet[Condition]) -> int:
+        columns = self.connection
+        conditions = frozenset(conditions)
+        try:
+            return columns.conditions_ids[conditions]
+        except KeyError:
+            pass
+
+        rows = [(int(c.type), int(c.value), c.associated_item) for c in conditions]
+        try:
+            self.__append_lines(columns.path('conditions.jsonl'), [rows])
+        except OSError:
+            _logger.exception(f'Failed storing new conditions into {self}: {conditions}!')
+            return -1
+
+        conditions_id = len(columns.conditions) + 1
+        columns.conditions[conditions_id] = conditions
+        columns.conditions_ids[conditions] = conditions_id
+        return conditions_id
+
+    def get_conditions_id(self, conditions: FrozenSet[Condition]) -> int:
+        try:
+            return self.connection.conditions_ids[conditions]
+        except KeyError:
+            raise ValueError
+
+    def get_conditions(self, conditions_id: int) -> FrozenSet[Condition]:
+        return self.connection.conditions.get(conditions_id, frozenset())
+
+    def store_event(self, event: Event) -> None:
+        self.store_events([event])
+
+    @writes
+    def store_events(self, events: Iterable[Event], batch_size: int = 100_000) -> None:
+        columns = self.connection
+        iterator = iter(events)
+        while True:
+            batch = list(itertools.islice(iterator, batch_size))
+            if not batch:
+                break
+
+            rows = {name: numpy.empty(len(batch), dtype=dtype) for name, dtype in _COLUMNS.items()}
+            try:
+                # The dictionaries are written first, so the columns never refer to unknown strings.
+                for i, event in enumerate(batch):
+                    item = event.item
+                    rows['timestamps'][i] = (event.timestamp - _EPOCH) // _MICROSECOND
+                    rows['items'][i] = self.__string_id(columns.item_names, columns.item_ids, 'item_names.jsonl',
+                                                        item.name)
+                    rows['old_states'][i] = self.__string_id(columns.states, columns.state_ids, 'states.jsonl',
+                                                             item.old_state)
+                    rows['new_states'][i] = self.__string_id(columns.states, columns.state_ids, 'states.jsonl',
+                                                             item.new_state)
+                    rows['conditions'][i] = self.store_conditions(event.conditions)
+                    if rows['conditions'][i] == -1:  # something went wrong
+                        raise OSError(f'Failed storing conditions of event {event}!')
+
+                for name, values in rows.items():
+                    with open(columns.path(f'{name}.bin'), 'ab') as fp:
+                        fp.write(values.tobytes())
+            except OSError:
+                _logger.exception(f'Failed storing {len(batch)} events into {self}!')
+                self.__truncate_columns(columns)
+                return
+
+            timestamps = rows['timestamps']
+            if columns.number_of_events and columns.time_ordered:
+                previous = self.__column(columns, 'timestamps')[-1]
+                columns.time_ordered = bool(timestamps[0] >= previous)
+            columns.time_ordered = columns.time_ordered and bool(numpy.all(timestamps[1:] >= timestamps[:-1]))
+            columns.number_of_events += len(batch)
+
+    def __truncate_columns(self, columns: _Columns) -> None:
+        """Truncate all columns to the stored events, e.g. after a batch was only appended to some of them."""
+        for name, dtype in _COLUMNS.items():
+            try:
+                os.truncate(columns.path(f'{name}.bin'), columns.number_of_events * numpy.dtype(dtype).itemsize)
+            except OSError:
+                _logger.exception(f'Failed truncating column "{name}" of {self} to {columns.number_of_events} '
+                                  f'events!')
+
+    def __string_id(self, strings: List[str], string_ids: Dict[str, int], filename: str, string: str) -> int:
+        try:
+            return string_ids[string]
+        except KeyError:
+            pass
+
+        self.__append_lines(self.connection.path(filename), [string])
+        string_ids[string] = len(strings)
+        strings.append(string)
+        return string_ids[string]
+
+    def __column(self, columns: _Columns, name: str) -> numpy.ndarray:
+        """Get a column of all events, which is mapped again after events were appended."""
+        number_of_events = columns.number_of_events
+        column = columns.maps.get(name)
+        if column is None or len(column) != number_of_events:
+            if number_of_events:
+                column = numpy.memmap(columns.path(f'{name}.bin'), dtype=_COLUMNS[name], mode='r',
+                                      shape=(number_of_events,))
+            else:
+                column = numpy.empty(0, dtype=_COLUMNS[name])
+            columns.maps[name] = column
+        return column
+
+    def get_columns(self, interval: Optional[int] = None, after: Optional[int] = None) -> Dict[str, numpy.ndarray]:
+        """Get the columns of the events from the last interval days (unfiltered, see ITEM_LIST).
+
+        While the events are stored in order of their timestamps, the columns are slices of the mapped files
+        (without copying).
+
+        Parameters
+        ----------
+        interval
+            Get only events of the last interval days (default is all).
+        after
+            Get only events with an id greater than after (default is all).
+
+        Returns
+        -------
+        The column of the ids and the columns of _COLUMNS by their names.
+        """
+        columns = self.connection
+        all_columns = {name: self.__column(columns, name) for name in _COLUMNS}
+        start, stop = min(after or 0, columns.number_of_events), columns.number_of_events
+        mask = None
+        if interval:
+            now = datetime.datetime.now()
+            begin = (now - datetime.timedelta(days=interval) - _EPOCH) // _MICROSECOND
+            end = (now - _EPOCH) // _MICROSECOND
+            timestamps = all_columns['timestamps']
+            if columns.time_ordered:
+                start = max(start, int(numpy.searchsorted(timestamps[:stop], begin, 'left')))
+                stop = max(start, int(numpy.searchsorted(timestamps[:stop], end, 'right')))
+            else:
+                mask = (timestamps[start:stop] >= begin) & (timestamps[start:stop] <= end)
+
+        result = {'ids': numpy.arange(start + 1, stop + 1, dtype=numpy.int64)}
+        result.update({name: column[start:stop] for name, column in all_columns.items()})
+        if mask is not None:
+            result = {name: column[mask] for name, column in result.items()}
+        return result
+
+    def __valid_mask(self, columns: Dict[str, numpy.ndarray], group: Optional[str]) -> numpy.ndarray:
+        """Get the valid events of columns (see ITEM_LIST.is_valid) with lookup tables of the string ids."""
+        item_names, states = self.connection.item_names, self.connection.states
+        rejected = numpy.array([state in ITEM_LIST.rejected_states for state in states], dtype=bool)
+        accepted = numpy.zeros((len(item_names), len(states)), dtype=bool)
+        for i, item_name in enumerate(item_names):
+            if group is None or group in ITEM_LIST.get_item_groups(item_name):
+                accepted_states = ITEM_LIST.get_item_states(item_name)
+                accepted[i] = [state in accepted_states for state in states]
+
+        items, old_states, new_states = columns['items'], columns['old_states'], columns['new_states']
+        return accepted[items, new_states] & ~rejected[old_states] & ~rejected[new_states]
+
+    def __events(self, ids: numpy.ndarray) -> Generator[Event, None, None]:
+        """Decode the events of ids."""
+        columns = self.connection
+        rows = ids - 1
+        item_names, states, conditions = columns.item_names, columns.states, columns.conditions
+        values = zip(ids.tolist(), self.__column(columns, 'timestamps')[rows].tolist(),
+                     self.__column(columns, 'items')[rows].tolist(),
+                     self.__column(columns, 'old_states')[rows].tolist(),
+                     self.__column(columns, 'new_states')[rows].tolist(),
+                     self.__column(columns, 'conditions')[rows].tolist())
+        for event_id, timestamp, item, old_state, new_state, conditions_id in values:
+            yield Event(Item(item_names[item], states[old_state], states[new_state]),
+                        _EPOCH + datetime.timedelta(microseconds=timestamp), conditions[conditions_id], event_id)
+
+    def get_number_of_events(self) -> int:
+        return self.connection.number_of_events
+
+    def iter_events(self, group: Optional[str] = None, interval: Optional[int] = None,
+                    after: Optional[int] = None) -> Iterator[Event]:
+        columns = self.get_columns(interval, after)
+        ids = columns['ids'][self.__valid_mask(columns, group)]
+        for i in range(0, len(ids), 10_000):  # decode in chunks, so the events are still read lazily
+            yield from self.__events(ids[i:i + 10_000])
+
+    @writes
+    def __journal(self, *records: Dict[str, Any]) -> None:
+        """Append changes of the learned data to the journal and apply them."""
+        columns = self.connection
+        self.__append_lines(columns.path('learned.jsonl'), records)
+        for record in records:
+            self.__apply(columns, record)
+
+    @staticmethod
+    def __apply(columns: _Columns, record: Dict[str, Any]) -> None:
+        """Apply a change of the learned data."""
+        group = record['group']
+        if record['type'] == 'event_sequence':
+            event_sequence_id = record['id']
+            columns.event_sequence_groups[event_sequence_id] = group
+            columns.event_sequences.setdefault(group, {})[event_sequence_id] = [tuple(row) for row in record['rows']]
+            columns.last_event_sequence_id = max(columns.last_event_sequence_id, event_sequence_id)
+        elif record['type'] == 'event_delay':
+            columns.event_delays[group] = record['value']
+        elif record['type'] == 'high_water_mark':
+            columns.high_water_marks[group] = record['event_id']
+
+    def __event_sequence_record(self, event_sequence: EventSequence, event_sequence_id: int, group: str
+                                ) -> Dict[str, Any]:
+        rows = [row[1:] for row in self._event_sequence_data(event_sequence, event_sequence_id)]
+        return {'type': 'event_sequence', 'group': group, 'id': event_sequence_id, 'rows': rows}
+
+    @writes
+    def store_event_sequence(self, event_sequence: EventSequence, group: str) -> None:
+        self.store_event_sequences(group, [event_sequence])
+
+    @writes
+    def update_event_sequence(self, event_sequence: EventSequence) -> None:
+        try:
+            group = self.connection.event_sequence_groups[event_sequence.id]
+        except KeyError:
+            _logger.error(f'Failed updating event sequence ({event_sequence.id}) in {self}!')
+            return
+        self.__journal(self.__event_sequence_record(event_sequence, event_sequence.id, group))
+
+    @writes
+    def store_event_sequences(self, group: str, event_sequences: Iterable[EventSequence],
+                              changed_event_sequences: Iterable[EventSequence] = (), event_delay: Optional[int] = None,
+                              high_water_mark: Optional[int] = None) -> None:
+        columns = self.connection
+        records = []
+        if event_delay is not None:
+            records.append({'type': 'event_delay', 'group': group, 'value': event_delay})
+        for event_sequence in changed_event_sequences:
+            records.append(self.__event_sequence_record(event_sequence, event_sequence.id, group))
+        event_sequence_id = columns.last_event_sequence_id
+        for event_sequence in event_sequences:
+            if len(event_sequence) < 2:  # do not store useless event sequences
+                continue
+            event_sequence_id += 1
+            records.append(self.__event_sequence_record(event_sequence, event_sequence_id, group))
+        if high_water_mark is not None:
+            records.append({'type': 'high_water_mark', 'group': group, 'event_id': high_water_mark})
+
+        try:
+            self.__journal(*records)
+        except OSError:
+            _logger.exception(f'Failed storing event sequences into {self} for group "{group}"!')
+
+    def store_event_delay(self, group: str, value: int) -> None:
+        self.store_event_sequences(group, [], event_delay=value)
+
+    def get_event_delay(self, group: str) -> int:
+        return self.connection.event_delays.get(group, 0)
+
+    def store_high_water_mark(self, group: str, event_id: int) -> None:
+        self.store_event_sequences(group, [], high_water_mark=event_id)
+
+    def get_high_water_mark(self, group: str) -> int:
+        return self.connection.high_water_marks.get(group, 0)
+
+    def get_event_sequences(self, group: str, compact: bool = False
+                            ) -> Dict[FrozenSet[Condition], List[Union[EventSequence, CompactEventSequence]]]:
+        library = list(self.connection.event_sequences.get(group, {}).items())
+
+        # Only the referenced events are decoded, like in SQLite only the valid events of the group.
+        ids = numpy.unique(numpy.array([(row[0], row[2]) for _, rows in library for row in rows],
+                                       dtype=numpy.int64).reshape(-1))
+        ids = ids[(ids >= 1) & (ids <= self.connection.number_of_events)]
+        columns = {name: self.__column(self.connection, name)[ids - 1] for name in _COLUMNS}
+        events = {event.id: event for event in self.__events(ids[self.__valid_mask(columns, group)])}
+
+        event_sequences = {}
+        for event_sequence_id, rows in library:
+            try:
+                rows = [(events[event_u_id], euo, events[event_v_id], evo, w)
+                        for event_u_id, euo, event_v_id, evo, w in sorted(rows)]
+            except KeyError:
+                _logger.exception(f'Invalid event sequence! Some events where not found but declared! - Skipping')
+                continue
+
+            event_sequence = self._event_sequence(event_sequence_id, rows, compact)
+            event_sequences.setdefault(event_sequence.conditions, []).append(event_sequence)
+        return event_sequences
+
+    @writes
+    def clear_learned(self, database_name: str) -> None:
+        columns = self.connection
+        try:
+            os.truncate(columns.path('learned.jsonl'), 0)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            _logger.exception(f'Failed clearing the learned data of database "{database_name}"!')
+            return
+
+        columns.event_sequences.clear()
+        columns.event_sequence_groups.clear()
+        columns.event_delays.clear()
+        columns.high_water_marks.clear()
@@ -15,6 +15,8 @@ import logging
 # […]
 
 # Project Imports
+from sharly.database.columnar import ColumnarDatabase
+from sharly.database.memory import MemoryDatabase
 from sharly.database.sqlite import SQLiteDatabase
 
 _logger = logging.getLogger(__name__)
@@ -25,6 +27,10 @@ class DatabaseFactory:
     def get_database(cls, engine: str, *args: Any, **kwargs: Any) -> Database:
         if engine == 'sqlite':
             return SQLiteDatabase(*args, **kwargs)
+        elif engine == 'memory':
+            return MemoryDatabase(*args, **kwargs)
+        elif engine == 'columnar':
+            return ColumnarDatabase(*args, **kwargs)
         else:
             error_message = f'Unknown database engine "{engine}"!'
             _logger.error(error_message)
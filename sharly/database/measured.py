@@ -0,0 +1,138 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+    from sharly.model.compact_event_sequence import CompactEventSequence
+    from sharly.model.condition import Condition
+    from sharly.model.event import Event
+    from sharly.model.event_sequence import EventSequence
+
+# Builtin Imports
+import logging
+import time
+
+# Library Imports
+# […]
+
+# Project Imports
+from sharly.database import Database
+from sharly.util.metrics import METRICS
+
+_logger = logging.getLogger(__name__)
+
+
+class MeasuredDatabase(Database):
+    """A database, which delegates to another database and records the time spent in each call (see METRICS).
+
+    Reads are recorded as db_read_ms, writes as db_write_ms. The time of iterators is recorded while they are
+    consumed, their items are counted as events_loaded. Calls of a database into itself are not recorded twice,
+    because they do not pass this database.
+    """
+    def __init__(self, database: Database) -> None:
+        # The other database holds the connections, so Database.__init__ is not called.
+        self._database = database
+
+    def __repr__(self) -> str:
+        return repr(self._database)
+
+    def __str__(self) -> str:
+        return str(self._database)
+
+    @property
+    def connection(self) -> Any:
+        return self._database.connection
+
+    def connect(self, *args: Any, **kwargs: Any) -> Any:
+        return self._database.connect(*args, **kwargs)
+
+    def disconnect(self) -> None:
+        self._database.disconnect()
+
+    def release(self) -> None:
+        self._database.release()
+
+    def store_conditions(self, conditions: FrozenSet[Condition]) -> int:
+        with METRICS.timer('db_write_ms'):
+            return self._database.store_conditions(conditions)
+
+    def get_conditions_id(self, conditions: FrozenSet[Condition]) -> int:
+        with METRICS.timer('db_read_ms'):
+            return self._database.get_conditions_id(conditions)
+
+    def get_conditions(self, conditions_id: int) -> FrozenSet[Condition]:
+        with METRICS.timer('db_read_ms'):
+            return self._database.get_conditions(conditions_id)
+
+    def store_event(self, event: Event) -> None:
+        with METRICS.timer('db_write_ms'):
+            self._database.store_event(event)
+
+    def store_events(self, events: Iterable[Event], batch_size: int = 1000) -> None:
+        with METRICS.timer('db_write_ms'):
+            self._database.store_events(events, batch_size)
+
+    def iter_events(self, group: Optional[str] = None, interval: Optional[int] = None,
+                    after: Optional[int] = None) -> Iterator[Event]:
+        iterator = self._database.iter_events(group, interval, after)
+        while True:
+            start = time.perf_counter()
+            try:
+                event = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                METRICS.add('db_read_ms', (time.perf_counter() - start) * 1000)
+            METRICS.add('events_loaded')
+            yield event
+
+    def get_number_of_events(self) -> int:
+        with METRICS.timer('db_read_ms'):
+            return self._database.get_number_of_events()
+
+    def get_events(self, group: Optional[str] = None, interval: Optional[int] = None,
+                   after: Optional[int] = None) -> List[Event]:
+        return list(self.iter_events(group, interval, after))
+
+    def store_event_sequence(self, event_sequence: EventSequence, group: str) -> None:
+        with METRICS.timer('db_write_ms'):
+            self._database.store_event_sequence(event_sequence, group)
+
+    def update_event_sequence(self, event_sequence: EventSequence) -> None:
+        with METRICS.timer('db_write_ms'):
+            self._database.update_event_sequence(event_sequence)
+
+    def store_event_sequences(self, group: str, event_sequences: Iterable[EventSequence],
+                              changed_event_sequences: Iterable[EventSequence] = (),
+                              event_delay: Optional[int] = None, high_water_mark: Optional[int] = None) -> None:
+        with METRICS.timer('db_write_ms'):
+            self._database.store_event_sequences(group, event_sequences, changed_event_sequences, event_delay,
+                                                 high_water_mark)
+
+    def store_event_delay(self, group: str, value: int) -> None:
+        with METRICS.timer('db_write_ms'):
+            self._database.store_event_delay(group, value)
+
+    def get_event_delay(self, group: str) -> int:
+        with METRICS.timer('db_read_ms'):
+            return self._database.get_event_delay(group)
+
+    def store_high_water_mark(self, group: str, event_id: int) -> None:
+        with METRICS.timer('db_write_ms'):
+            self._database.store_high_water_mark(group, event_id)
+
+    def get_high_water_mark(self, group: str) -> int:
+        with METRICS.timer('db_read_ms'):
+            return self._database.get_high_water_mark(group)
+
+    def get_event_sequences(self, group: str, compact: bool = False
+                            ) -> Dict[FrozenSet[Condition], List[Union[EventSequence, CompactEventSequence]]]:
+        with METRICS.timer('db_read_ms'):
+            return self._database.get_event_sequences(group, compact)
+
+    def clear_learned(self, database_name: str) -> None:
+        with METRICS.timer('db_write_ms'):
+            self._database.clear_learned(database_name)
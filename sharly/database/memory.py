@@ -0,0 +1,312 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+    from sharly.model.compact_event_sequence import CompactEventSequence
+    from sharly.model.condition import Condition
+    from sharly.model.event_sequence import EventSequence
+
+# Builtin Imports
+import bisect
+import dataclasses
+import datetime
+import logging
+
+# Library Imports
+# […]
+
+# Project Imports
+from sharly.database import Database, writes
+from sharly.model.event import Event
+from sharly.util.item_list import ITEM_LIST
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class _Store:
+    """The data of a memory database, which is shared by all its connections."""
+    # Interned condition sets (each condition set exists once)
+    conditions: Dict[int, FrozenSet[Condition]] = dataclasses.field(default_factory=dict)
+    conditions_ids: Dict[FrozenSet[Condition], int] = dataclasses.field(default_factory=dict)
+
+    # Events in order of their ids (ascending), the timestamps are a parallel array
+    event_ids: List[int] = dataclasses.field(default_factory=list)
+    timestamps: List[datetime.datetime] = dataclasses.field(default_factory=list)
+    events: List[Event] = dataclasses.field(default_factory=list)
+    events_by_id: Dict[int, Event] = dataclasses.field(default_factory=dict)
+    time_ordered: bool = True  # the timestamps are ascending, so intervals are found by bisection
+
+    # Rows (event_u_id, event_u_occurrence, event_v_id, event_v_occurrence, weight) of each event sequence by group
+    event_sequences: Dict[str, Dict[int, List[Tuple[int, ...]]]] = dataclasses.field(default_factory=dict)
+    event_sequence_groups: Dict[int, str] = dataclasses.field(default_factory=dict)
+    last_event_sequence_id: int = 0
+
+    event_delays: Dict[str, int] = dataclasses.field(default_factory=dict)
+    high_water_marks: Dict[str, int] = dataclasses.field(default_factory=dict)
+
+
+class MemoryDatabase(Database):
+    """A database, which keeps everything in memory (e.g. for benchmarks or a detector without disk access).
+
+    The data is lost with the database, but it can be restored from and snapshot into another database (e.g. SQLite).
+    All threads share the same data, writes are serialized like in every database (see writes).
+    """
+    def __init__(self, database_name: str, clear: bool = True, **_kwargs: Any) -> None:
+        self._store = _Store()  # a memory database is always clear
+        super().__init__()
+
+    @property
+    def connection(self) -> _Store:
+        # There is nothing to connect to, so all threads use the data directly.
+        return self._store
+
+    def connect(self) -> _Store:
+        return self._store
+
+    def disconnect(self) -> None:
+        pass
+
+    @writes
+    def store_conditions(self, conditions: FrozenSet[Condition]) -> int:
+        store = self.connection
+        conditions = frozenset(conditions)
+        try:
+            return store.conditions_ids[conditions]
+        except KeyError:
+            pass
+
+        conditions_id = len(store.conditions) + 1
+        store.conditions[conditions_id] = conditions
+        store.conditions_ids[conditions] = conditions_id
+        return conditions_id
+
+    def get_conditions_id(self, conditions: FrozenSet[Condition]) -> int:
+        try:
+            return self.connection.conditions_ids[conditions]
+        except KeyError:
+            raise ValueError
+
+    def get_conditions(self, conditions_id: int) -> FrozenSet[Condition]:
+        return self.connection.conditions.get(conditions_id, frozenset())
+
+    @writes
+    def store_event(self, event: Event) -> None:
+        store = self.connection
+        event_id = store.event_ids[-1] + 1 if store.event_ids else 1
+        self.__append(event, event_id)
+
+    @writes
+    def store_events(self, events: Iterable[Event], batch_size: int = 1000) -> None:
+        for event in events:
+            self.store_event(event)
+
+    def __append(self, event: Event, event_id: int) -> None:
+        """Append an event with an id greater than all stored ids (its conditions are interned)."""
+        store = self.connection
+        conditions = store.conditions[self.store_conditions(event.conditions)]
+        event = Event(event.item, event.timestamp, conditions, event_id)
+        if store.timestamps and event.timestamp < store.timestamps[-1]:
+            store.time_ordered = False
+
+        # The id is appended last, so readers of other threads only see complete events.
+        store.events_by_id[event_id] = event
+        store.events.append(event)
+        store.timestamps.append(event.timestamp)
+        store.event_ids.append(event_id)
+
+    def get_number_of_events(self) -> int:
+        return len(self.connection.event_ids)
+
+    def iter_events(self, group: Optional[str] = None, interval: Optional[int] = None,
+                    after: Optional[int] = None) -> Iterator[Event]:
+        store = self.connection
+        start, stop = 0, len(store.event_ids)
+        if after:
+            start = bisect.bisect_right(store.event_ids, after, start, stop)
+
+        begin, end = None, None
+        if interval:
+            end = datetime.datetime.now()
+            begin = end - datetime.timedelta(days=interval)
+            if store.time_ordered:
+                start = max(start, bisect.bisect_left(store.timestamps, begin, 0, stop))
+                stop = bisect.bisect_right(store.timestamps, end, start, stop)
+                begin, end = None, None  # no need to compare each event
+
+        for i in range(start, stop):
+            event = store.events[i]
+            if begin is not None and not begin <= event.timestamp <= end:
+                continue
+            item = event.item
+            if ITEM_LIST.is_valid(item.name, item.old_state, item.new_state, group):
+                yield event
+
+    @writes
+    def store_event_sequence(self, event_sequence: EventSequence, group: str) -> None:
+        if len(event_sequence) < 2:  # do not store useless event sequences
+            _logger.debug(f'Skipped storing useless event sequence (node-count={event_sequence.number_of_nodes()}).')
+            return
+
+        store = self.connection
+        store.last_event_sequence_id += 1
+        event_sequence_id = store.last_event_sequence_id
+        store.event_sequence_groups[event_sequence_id] = group
+        store.event_sequences.setdefault(group, {})[event_sequence_id] = \
+            [row[1:] for row in self._event_sequence_data(event_sequence, event_sequence_id)]
+
+    @writes
+    def update_event_sequence(self, event_sequence: EventSequence) -> None:
+        store = self.connection
+        try:
+            group = store.event_sequence_groups[event_sequence.id]
+        except KeyError:
+            _logger.error(f'Failed updating event sequence ({event_sequence.id}) in {self}!')
+            return
+
+        store.event_sequences[group][event_sequence.id] = \
+            [row[1:] for row in self._event_sequence_data(event_sequence, event_sequence.id)]
+
+    @writes
+    def store_event_delay(self, group: str, value: int) -> None:
+        self.connection.event_delays[group] = value
+
+    def get_event_delay(self, group: str) -> int:
+        return self.connection.event_delays.get(group, 0)
+
+    @writes
+    def store_high_water_mark(self, group: str, event_id: int) -> None:
+        self.connection.high_water_marks[group] = event_id
+
+    def get_high_water_mark(self, group: str) -> int:
+        return self.connection.high_water_marks.get(group, 0)
+
+    def get_event_sequences(self, group: str, compact: bool = False
+                            ) -> Dict[FrozenSet[Condition], List[Union[EventSequence, CompactEventSequence]]]:
+        store = self.connection
+        event_sequences = {}
+        for event_sequence_id, rows in list(store.event_sequences.get(group, {}).items()):
+            # Like SQLite, only the valid events of the group are resolved (see iter_events).
+            try:
+                rows = [(self.__valid_event(event_u_id, group), euo, self.__valid_event(event_v_id, group), evo, w)
+                        for event_u_id, euo, event_v_id, evo, w in sorted(rows)]
+            except KeyError:
+                _logger.exception(f'Invalid event sequence! Some events where not found but declared! - Skipping')
+                continue
+
+            event_sequence = self._event_sequence(event_sequence_id, rows, compact)
+            event_sequences.setdefault(event_sequence.conditions, []).append(event_sequence)
+        return event_sequences
+
+    def __valid_event(self, event_id: int, group: str) -> Event:
+        event = self.connection.events_by_id[event_id]
+        item = event.item
+        if not ITEM_LIST.is_valid(item.name, item.old_state, item.new_state, group):
+            raise KeyError(event_id)
+        return event
+
+    @writes
+    def clear_learned(self, database_name: str) -> None:
+        store = self.connection
+        store.event_sequences.clear()
+        store.event_sequence_groups.clear()
+        store.event_delays.clear()
+        store.high_water_marks.clear()
+
+    @writes
+    def restore(self, database: Database) -> None:
+        """Replace all data by the data of another database (e.g. SQLite).
+
+        The valid events (see ITEM_LIST) and the learned data of all groups of the item list are restored,
+        the ids of the events and event sequences are kept.
+
+        Parameters
+        ----------
+        database
+            The database to restore from.
+        """
+        store = self._store = _Store()
+        for event in database.iter_events():
+            self.__append(event, event.id)
+
+        for group in sorted(ITEM_LIST.groups):
+            for event_sequences in database.get_event_sequences(group).values():
+                for event_sequence in event_sequences:
+                    store.event_sequence_groups[event_sequence.id] = group
+                    store.event_sequences.setdefault(group, {})[event_sequence.id] = \
+                        [row[1:] for row in self._event_sequence_data(event_sequence, event_sequence.id)]
+                    store.last_event_sequence_id = max(store.last_event_sequence_id, event_sequence.id)
+
+            event_delay = database.get_event_delay(group)
+            if event_delay:
+                store.event_delays[group] = event_delay
+            high_water_mark = database.get_high_water_mark(group)
+            if high_water_mark:
+                store.high_water_marks[group] = high_water_mark
+        _logger.info(f'Restored {len(store.events)} events into {self} from {database}.')
+
+    @writes
+    def snapshot(self, database: Database) -> None:
+        """Store all data into another database (e.g. SQLite), which has to be clear.
+
+        The other database assigns new ids, the event sequences and high-water marks refer to them.
+
+        Parameters
+        ----------
+        database
+            The clear database to store into.
+
+        Raises
+        ------
+        ValueError
+            If the other database already has events.
+        RuntimeError
+            If not all events were stored (the learned data is not stored then).
+        """
+        if database.get_number_of_events() != 0:
+            error_message = f'Cannot store a snapshot of {self} into {database}, which is not clear!'
+            _logger.error(error_message)
+            raise ValueError(error_message)
+
+        store = self.connection
+        event_ids = list(store.event_ids)
+        database.store_events(store.events)
+
+        # The event sequences refer to the new ids, so all events have to be stored (e.g. SQLite skips an event,
+        # whose conditions could not be stored).
+        number_of_events = database.get_number_of_events()
+        if number_of_events != len(event_ids):
+            error_message = f'Failed storing a snapshot of {self} into {database}, only {number_of_events} of ' \
+                            f'{len(event_ids)} events were stored!'
+            _logger.error(error_message)
+            raise RuntimeError(error_message)
+
+        # A clear database numbers the events from 1 in order of storing.
+        events = {event_id: Event(event.item, event.timestamp, event.conditions, i)
+                  for i, (event_id, event) in enumerate(zip(event_ids, store.events), 1)}
+        for group in sorted(set(store.event_sequences) | set(store.event_delays) | set(store.high_water_marks)):
+            event_sequences = self.get_event_sequences(group)
+            for event_sequence_list in event_sequences.values():
+                for i, event_sequence in enumerate(event_sequence_list):
+                    event_sequence_list[i] = self.__renumber(event_sequence, events)
+
+            high_water_mark = store.high_water_marks.get(group)
+            if high_water_mark is not None:
+                high_water_mark = bisect.bisect_right(event_ids, high_water_mark)  # new id of the last event before
+
+            database.store_event_sequences(
+                group, [event_sequence for event_sequence_list in event_sequences.values()
+                        for event_sequence in event_sequence_list],
+                event_delay=store.event_delays.get(group), high_water_mark=high_water_mark
+            )
+        _logger.info(f'Stored a snapshot of {len(event_ids)} events of {self} into {database}.')
+
+    def __renumber(self, event_sequence: EventSequence, events: Dict[int, Event]) -> EventSequence:
+        """Copy an event sequence, whose events refer to their new ids."""
+        rows = [(events[event_u_id], euo, events[event_v_id], evo, w)
+                for _, event_u_id, euo, event_v_id, evo, w in self._event_sequence_data(event_sequence, 0)]
+        return self._event_sequence(0, rows, False)
@@ -6,104 +6,243 @@ from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from typing import *
+    from sharly.model.compact_event_sequence import CompactEventSequence
+    from sharly.model.event_sequence import EventSequence
 
 # Builtin Imports
 import datetime
+import itertools
 import logging
+import operator
 import os
 import sqlite3
+import threading
 
 # Library Imports
 # […]
 
 # Project Imports
-from sharly.database import Database
+from sharly.database import Database, writes
 from sharly.model.condition import Condition
 from sharly.model.event import Event, Item
-from sharly.model.event_sequence import EventSequence
 from sharly.util.item_list import ITEM_LIST
+from sharly.util.metrics import METRICS
 
 _logger = logging.getLogger(__name__)
 
 
+def _conditions_key(rows: Iterable[Tuple[int, int, str]]) -> str:
+    """Get the canonical key of a condition set from its (condition_type, condition_value, item_name) rows."""
+    return ';'.join(f'{condition_type}:{condition_value}:{item_name}'
+                    for condition_type, condition_value, item_name in sorted(rows))
+
+
+def _add_conditions_keys(cursor: sqlite3.Cursor) -> None:
+    """Store the key of each condition set, which was stored before the keys existed.
+
+    Empty condition sets used to be stored once per event, only the first of equal condition sets gets its key.
+    """
+    cursor.execute('SELECT c.`conditions_id`, d.`condition_type`, d.`condition_value`, d.`item_name` '
+                   'FROM `conditions` c LEFT JOIN `condition_data` d ON c.`conditions_id` = d.`conditions_id` '
+                   'ORDER BY c.`conditions_id`')
+    rows_dict: Dict[int, List[Tuple[int, int, str]]] = {}
+    for conditions_id, condition_type, condition_value, item_name in cursor.fetchall():
+        rows = rows_dict.setdefault(conditions_id, [])
+        if condition_type is not None:
+            rows.append((condition_type, condition_value, item_name))
+
+    keys_dict: Dict[str, int] = {}
+    for conditions_id, rows in rows_dict.items():
+        keys_dict.setdefault(_conditions_key(rows), conditions_id)
+    cursor.executemany('UPDATE `conditions` SET `key` = ? WHERE `conditions_id` = ?', keys_dict.items())
+
+
+# The schema is evolved by migrations, which are applied in order (see SQLiteDatabase.__migrate).
+# The schema version of a database is the number of applied migrations, so released migrations must never change.
+# A migration consists of SQL statements and functions, which get the cursor of the migration.
+_MIGRATIONS: Tuple[Tuple[Union[str, Callable[[sqlite3.Cursor], None]], ...], ...] = (
+    # 1: tables (existing databases without a schema version already have some of them)
+    (
+        'CREATE TABLE IF NOT EXISTS `conditions` ('
+        '   `conditions_id` INTEGER NOT NULL,'
+        '   PRIMARY KEY (`conditions_id`)'
+        ')',
+        'CREATE TABLE IF NOT EXISTS `condition_data` ('
+        '   `conditions_id` INTEGER NOT NULL,'
+        '   `condition_type` INTEGER NOT NULL,'
+        '   `condition_value` INTEGER NOT NULL,'
+        '   `item_name` TEXT NOT NULL,'
+        '   PRIMARY KEY (`conditions_id`, `condition_type`, `item_name`)'
+        ')',
+        'CREATE TABLE IF NOT EXISTS `events` ('
+        '   `event_id` INTEGER NOT NULL,'
+        '   `item_name` TEXT NOT NULL,'
+        '   `old_state` TEXT NOT NULL,'
+        '   `new_state` TEXT NOT NULL,'
+        '   `timestamp` TIMESTAMP NOT NULL,'
+        '   `conditions_id` INT NOT NULL,'
+        '   PRIMARY KEY (`event_id`),'
+        '   FOREIGN KEY (`conditions_id`) REFERENCES conditions(`conditions_id`)'
+        ')',
+        'CREATE TABLE IF NOT EXISTS `event_sequences` ('
+        '   `event_sequence_id` INTEGER NOT NULL,'
+        '   `group` TEXT NOT NULL,'
+        '   PRIMARY KEY (`event_sequence_id`)'
+        ')',
+        'CREATE TABLE IF NOT EXISTS `event_sequence_data` ('
+        '   `event_sequence_id` INTEGER NOT NULL,'
+        '   `event_u_id` INTEGER NOT NULL,'
+        '   `event_u_occurrence` INTEGER NOT NULL,'
+        '   `event_v_id` INTEGER NOT NULL,'
+        '   `event_v_occurrence` INTEGER NOT NULL,'
+        '   `weight` INTEGER NOT NULL,'
+        '   PRIMARY KEY (`event_sequence_id`, `event_u_id`, `event_v_id`)'
+        ')',
+        'CREATE TABLE IF NOT EXISTS `event_delays` ('
+        '   `group` TEXT NOT NULL,'
+        '   `value` INTEGER NOT NULL,'
+        '   PRIMARY KEY (`group`)'
+        ')',
+        'CREATE TABLE IF NOT EXISTS `high_water_marks` ('
+        '   `group` TEXT NOT NULL,'
+        '   `event_id` INTEGER NOT NULL,'
+        '   PRIMARY KEY (`group`)'
+        ')',
+    ),
+    # 2: indexes of the interval scan, the item filter and the event sequences of a group
+    # (the event sequence data of a sequence is already found by the prefix of its primary key)
+    (
+        'CREATE INDEX IF NOT EXISTS `events_timestamp` ON `events` (`timestamp`)',
+        'CREATE INDEX IF NOT EXISTS `events_item_name` ON `events` (`item_name`, `new_state`)',
+        'CREATE INDEX IF NOT EXISTS `event_sequences_group` ON `event_sequences` (`group`)',
+    ),
+    # 3: canonical key of each condition set (see _conditions_key), so a condition set is found by a single lookup
+    (
+        'ALTER TABLE `conditions` ADD COLUMN `key` TEXT',
+        _add_conditions_keys,
+        'CREATE UNIQUE INDEX IF NOT EXISTS `conditions_key` ON `conditions` (`key`)',
+    ),
+)
+
+
+# The tunable pragmas of a connection with a check of their values.
+# The journal mode is always WAL, so the readers of other threads do not block the writer (see Database).
+_PRAGMAS: Dict[str, Callable[[Union[str, int]], bool]] = {
+    'synchronous': lambda value: str(value).lower() in ('off', 'normal', 'full', 'extra', '0', '1', '2', '3'),
+    'cache_size': lambda value: isinstance(value, int),  # pages or (if negative) KiB
+    'mmap_size': lambda value: isinstance(value, int) and value >= 0,  # bytes
+}
+
+
 class SQLiteDatabase(Database):
-    def __init__(self, database_name: str, clear: bool, **_kwargs: Any) -> None:
+    def __init__(self, database_name: str, clear: bool, pragmas: Optional[Dict[str, Union[str, int]]] = None,
+                 **_kwargs: Any) -> None:
+        """Open a SQLite database.
+
+        Parameters
+        ----------
+        database_name
+            The name of the database file (without .db).
+        clear
+            Remove the database file before opening it.
+        pragmas
+            The pragmas of the connections, e.g. {'synchronous': 'normal', 'cache_size': -65536} (see _PRAGMAS).
+        """
+        # Condition sets are never changed once stored, so they are cached for the lifetime of the database.
+        self._conditions_cache: Dict[int, FrozenSet[Condition]] = {}
+        self._conditions_ids: Dict[FrozenSet[Condition], int] = {}  # the inverse of the cache
+        self._conditions_lock = threading.RLock()  # the caches are shared by the threads
+        self._conditions_prefetched = 0  # all condition sets up to this id are cached (see __prefetch_conditions)
         if clear:
             self.__clear(database_name)
-        super().__init__(database_name=database_name)
-        self.__create_tables(database_name)
+        super().__init__(database_name=database_name, pragmas=pragmas or {})
+        self.__migrate(database_name)
 
     def __clear(self, database_name: str) -> None:
+        for suffix in ('', '-wal', '-shm'):  # the write-ahead log belongs to the database
+            try:
+                os.remove(f'{database_name}.db{suffix}')
+            except FileNotFoundError:
+                pass
+            except OSError:
+                _logger.exception(f'Failed clearing "{database_name}"!')
+                raise
+        _logger.info(f'Cleared {self}.')
+
+    @writes
+    def __migrate(self, database_name: str) -> None:
+        """Bring the schema of the database up to date by applying the missing migrations in order.
+
+        Each migration is applied in its own transaction together with its new schema version.
+        """
+        cursor = self.connection.cursor()
         try:
-            os.remove(f'{database_name}.db')
-        except FileNotFoundError:
-            pass
-        except OSError:
-            _logger.exception(f'Failed clearing "{database_name}"!')
+            cursor.execute('CREATE TABLE IF NOT EXISTS `schema_version` (`version` INTEGER NOT NULL)')
+            cursor.execute('SELECT MAX(`version`) FROM `schema_version`')
+            version = cursor.fetchone()[0] or 0
+            if version > len(_MIGRATIONS):
+                _logger.warning(f'Schema version {version} of database "{database_name}" is newer than this version '
+                                f'of sharly ({len(_MIGRATIONS)})!')
+
+            for version, statements in enumerate(_MIGRATIONS[version:], version + 1):
+                cursor.execute('BEGIN')
+                for statement in statements:
+                    if callable(statement):
+                        statement(cursor)
+                    else:
+                        cursor.execute(statement)
+                cursor.execute('INSERT INTO `schema_version` (`version`) VALUES (?)', (version,))
+                cursor.execute('COMMIT')
+                _logger.info(f'Migrated database "{database_name}" on {self} to schema version {version}.')
+        except sqlite3.Error:
+            _logger.exception(f'Failed migrating database "{database_name}" on {self}.')
+            if self.connection.in_transaction:
+                cursor.execute('ROLLBACK')
             raise
-        _logger.info(f'Cleared {self}.')
+        finally:
+            cursor.close()
+
+    def __create_item_list_tables(self, connection: sqlite3.Connection) -> None:
+        """Mirror the item list into temporary tables of the connection, so events are filtered inside SQLite.
 
-    def __create_tables(self, database_name: str) -> None:
+        The tables hold the same rules as ITEM_LIST.is_valid: the accepted states of each item,
+        the groups of each item and the rejected states.
+        """
         tables = {
-            'conditions': (
-                'CREATE TABLE IF NOT EXISTS `conditions` ('
-                '   `conditions_id` INTEGER NOT NULL,'
-                '   PRIMARY KEY (`conditions_id`)'
-                ')'
-            ),
-            'condition_data': (
-                'CREATE TABLE IF NOT EXISTS `condition_data` ('
-                '   `conditions_id` INTEGER NOT NULL,'
-                '   `condition_type` INTEGER NOT NULL,'
-                '   `condition_value` INTEGER NOT NULL,'
+            'accepted_states': (
+                'CREATE TEMP TABLE IF NOT EXISTS `accepted_states` ('
                 '   `item_name` TEXT NOT NULL,'
-                '   PRIMARY KEY (`conditions_id`, `condition_type`, `item_name`)'
-                ')'
+                '   `state` TEXT NOT NULL,'
+                '   PRIMARY KEY (`item_name`, `state`)'
+                ')',
+                'INSERT OR IGNORE INTO temp.`accepted_states` (`item_name`, `state`) VALUES (?, ?)',
+                [(item_name, state) for item_name, (_, states) in ITEM_LIST.items for state in states]
             ),
-            'events': (
-                'CREATE TABLE IF NOT EXISTS `events` ('
-                '   `event_id` INTEGER NOT NULL,'
-                '   `item_name` TEXT NOT NULL,'
-                '   `old_state` TEXT NOT NULL,'
-                '   `new_state` TEXT NOT NULL,'
-                '   `timestamp` TIMESTAMP NOT NULL,'
-                '   `conditions_id` INT NOT NULL,'
-                '   PRIMARY KEY (`event_id`),'
-                '   FOREIGN KEY (`conditions_id`) REFERENCES conditions(`conditions_id`)'
-                ')'
-            ),
-            'event_sequences': (
-                'CREATE TABLE IF NOT EXISTS `event_sequences` ('
-                '   `event_sequence_id` INTEGER NOT NULL,'
+            'item_groups': (
+                'CREATE TEMP TABLE IF NOT EXISTS `item_groups` ('
                 '   `group` TEXT NOT NULL,'
-                '   PRIMARY KEY (`event_sequence_id`)'
-                ')'
+                '   `item_name` TEXT NOT NULL,'
+                '   PRIMARY KEY (`group`, `item_name`)'
+                ')',
+                'INSERT OR IGNORE INTO temp.`item_groups` (`group`, `item_name`) VALUES (?, ?)',
+                [(group, item_name) for item_name, (groups, _) in ITEM_LIST.items for group in groups]
             ),
-            'event_sequence_data': (
-                'CREATE TABLE IF NOT EXISTS `event_sequence_data` ('
-                '   `event_sequence_id` INTEGER NOT NULL,'
-                '   `event_u_id` INTEGER NOT NULL,'
-                '   `event_u_occurrence` INTEGER NOT NULL,'
-                '   `event_v_id` INTEGER NOT NULL,'
-                '   `event_v_occurrence` INTEGER NOT NULL,'
-                '   `weight` INTEGER NOT NULL,'
-                '   PRIMARY KEY (`event_sequence_id`, `event_u_id`, `event_v_id`)'
-                ')'
+            'rejected_states': (
+                'CREATE TEMP TABLE IF NOT EXISTS `rejected_states` ('
+                '   `state` TEXT NOT NULL,'
+                '   PRIMARY KEY (`state`)'
+                ')',
+                'INSERT OR IGNORE INTO temp.`rejected_states` (`state`) VALUES (?)',
+                [(state,) for state in ITEM_LIST.rejected_states]
             ),
-            'event_delays': (
-                'CREATE TABLE IF NOT EXISTS `event_delays` ('
-                '   `group` TEXT NOT NULL,'
-                '   `value` INTEGER NOT NULL,'
-                '   PRIMARY KEY (`group`)'
-                ')'
-            )
         }
-        cursor = self.connection.cursor()
-        for table_name, query in tables.items():
+        cursor = connection.cursor()
+        for table_name, (create_query, insert_query, data) in tables.items():
             try:
-                cursor.execute(query)
+                cursor.execute(create_query)
+                cursor.executemany(insert_query, data)
             except sqlite3.Error:
-                _logger.exception(f'Failed creating table "{table_name}" for database "{database_name}" on {self}.')
+                _logger.exception(f'Failed creating temporary table "{table_name}" on {self}.')
                 cursor.close()
                 raise
         cursor.close()
@@ -112,89 +251,139 @@ class SQLiteDatabase(Database):
     def connection(self) -> sqlite3.Connection:
         return super().connection
 
-    def connect(self, database_name: str) -> sqlite3.Connection:
+    def connect(self, database_name: str, pragmas: Dict[str, Union[str, int]]) -> sqlite3.Connection:
         try:
             connection = sqlite3.connect(f'{database_name}.db', detect_types=sqlite3.PARSE_DECLTYPES,  # parse timestamp
-                                         isolation_level=None)  # autocommit = True
+                                         isolation_level=None,  # autocommit = True
+                                         check_same_thread=False)  # all connections are closed by disconnect
+            connection.execute('PRAGMA journal_mode = wal')
         except sqlite3.Error:
             _logger.exception(f'Failed connecting to {self}!')
             raise
 
+        for name, value in pragmas.items():
+            # Pragmas do not accept parameters, so only known pragmas with valid values are executed.
+            if name not in _PRAGMAS or not _PRAGMAS[name](value):
+                _logger.warning(f'Ignored invalid pragma {name}={value!r} for {self}.')
+                continue
+            try:
+                connection.execute(f'PRAGMA {name} = {value}')
+            except sqlite3.Error:
+                _logger.exception(f'Failed setting pragma {name}={value!r} for {self}!')
+
+        self.__create_item_list_tables(connection)
         _logger.info(f'Connected to {self}.')
         return connection
 
     def disconnect(self) -> None:
-        self.connection.close()
+        with self._connections_lock:
+            self._connection.close()
+            for connection in self._connections.values():
+                connection.close()
+            self._connections.clear()
 
+    @writes
     def store_conditions(self, conditions: FrozenSet[Condition]) -> int:
+        data = [(int(c.type), int(c.value), c.associated_item or 'NULL') for c in conditions]
         cursor = self.connection.cursor()
-        query = 'INSERT INTO `conditions` (`conditions_id`) VALUES (NULL)'
         try:
-            cursor.execute(query)
-        except sqlite3.Error:
-            _logger.exception(f'Failed storing new conditions into {self}: {conditions}!')
-            return -1
-
-        conditions_id = cursor.lastrowid
-        query = 'INSERT INTO `condition_data` ' \
-                '(`conditions_id`, `condition_type`, `condition_value`, `item_name`) VALUES ' \
-                '(?, ?, ?, ?)'
-        data = [(conditions_id, int(c.type), int(c.value), c.associated_item or 'NULL') for c in conditions]
-        try:
-            cursor.executemany(query, data)
+            # The condition set and its data are stored at once, so a condition set never lacks its data.
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('INSERT INTO `conditions` (`conditions_id`, `key`) VALUES (NULL, ?)',
+                           (_conditions_key(data),))
+            conditions_id = cursor.lastrowid
+            cursor.executemany('INSERT INTO `condition_data` '
+                               '(`conditions_id`, `condition_type`, `condition_value`, `item_name`) VALUES '
+                               '(?, ?, ?, ?)', [(conditions_id, *row) for row in data])
+            cursor.execute('COMMIT')
         except sqlite3.Error:
             _logger.exception(f'Failed storing new conditions into {self}: {conditions}!')
+            if self.connection.in_transaction:
+                cursor.execute('ROLLBACK')
             return -1
+        finally:
+            cursor.close()
 
-        cursor.close()
+        self.__cache_conditions(conditions_id, frozenset(conditions))
         return conditions_id
 
     def get_conditions_id(self, conditions: FrozenSet[Condition]) -> int:
+        try:
+            return self._conditions_ids[conditions]
+        except KeyError:
+            pass
+
+        # The condition set may have been stored by another connection.
+        data = [(int(c.type), int(c.value), c.associated_item or 'NULL') for c in conditions]
         cursor = self.connection.cursor()
-        query = 'SELECT `conditions_id`, `condition_type`, `condition_value`, `item_name` FROM condition_data'
+        query = 'SELECT `conditions_id` FROM `conditions` WHERE `key` = ?'
         try:
-            cursor.execute(query)
+            cursor.execute(query, (_conditions_key(data),))
         except sqlite3.Error:
             _logger.exception(f'Could not get conditions from {self} for conditions: {conditions}!')
             raise ValueError
 
-        stored_conditions_dict = {}
-        for conditions_id, condition_type, condition_value, item_name in cursor:
-            if conditions_id not in stored_conditions_dict:
-                stored_conditions_dict[conditions_id] = set()
-
-            condition = Condition.Type(condition_type).to_class().from_enum(condition_value)
-            if item_name != 'NULL':
-                condition.associated_item = item_name
-            stored_conditions_dict[conditions_id].add(condition)
+        row = cursor.fetchone()
         cursor.close()
+        if row is None:
+            raise ValueError
+
+        self.__cache_conditions(row[0], frozenset(conditions))
+        return row[0]
 
-        for conditions_id, stored_conditions in stored_conditions_dict.items():
-            if stored_conditions == conditions:
-                return conditions_id
-        raise ValueError
+    def __cache_conditions(self, conditions_id: int, conditions: FrozenSet[Condition]) -> None:
+        with self._conditions_lock:
+            self._conditions_cache[conditions_id] = conditions
+            self._conditions_ids.setdefault(conditions, conditions_id)
 
     def get_conditions(self, conditions_id: int) -> FrozenSet[Condition]:
+        try:
+            return self._conditions_cache[conditions_id]
+        except KeyError:
+            self.__prefetch_conditions()
+            return self._conditions_cache.get(conditions_id, frozenset())
+
+    def __prefetch_conditions(self) -> None:
+        """Load all condition sets, which were not prefetched yet, with a single query.
+
+        Condition sets are only ever added with ascending ids, so only the ids after the last prefetched id are read.
+        The cache itself is no watermark, because storing and resolving condition sets caches single (newer) ids.
+        Events, which share a condition set, share the same frozenset afterwards.
+        """
         cursor = self.connection.cursor()
-        query = 'SELECT `conditions_id`, `condition_type`, `condition_value`, `item_name` FROM condition_data ' \
-                'WHERE `conditions_id` = ?'
-        data = (conditions_id,)
+        query = 'SELECT c.`conditions_id`, d.`condition_type`, d.`condition_value`, d.`item_name` ' \
+                'FROM `conditions` c LEFT JOIN `condition_data` d ON c.`conditions_id` = d.`conditions_id` ' \
+                'WHERE c.`conditions_id` > ?'
+        with self._conditions_lock:
+            data = (self._conditions_prefetched,)
         try:
             cursor.execute(query, data)
         except sqlite3.Error:
-            _logger.exception(f'Could not get conditions from {self} for conditions_id={conditions_id}!')
+            _logger.exception(f'Could not prefetch conditions from {self}!')
             cursor.close()
-            return frozenset()
-
-        conditions = set()
-        for _, condition_type, condition_value, item_name in cursor:
-            condition = Condition.Type(condition_type).to_class().from_enum(condition_value)
-            if item_name != 'NULL':
-                condition.associated_item = item_name
-            conditions.add(condition)
+            return
+
+        conditions_dict: Dict[int, Set[Condition]] = {}
+        for conditions_id, condition_type, condition_value, item_name in cursor:
+            conditions = conditions_dict.setdefault(conditions_id, set())
+            if condition_type is not None:  # condition sets may be empty
+                conditions.add(self.__condition(condition_type, condition_value, item_name))
         cursor.close()
-        return frozenset(conditions)
 
+        with self._conditions_lock:
+            for conditions_id, conditions in conditions_dict.items():
+                self.__cache_conditions(conditions_id, frozenset(conditions))
+            self._conditions_prefetched = max(self._conditions_prefetched, *conditions_dict, 0)
+
+    @staticmethod
+    def __condition(condition_type: int, condition_value: int, item_name: str) -> Condition:
+        """Create a condition from a row of the condition_data table."""
+        condition = Condition.Type(condition_type).to_class().from_enum(condition_value)
+        if item_name != 'NULL':
+            condition.associated_item = item_name
+        return condition
+
+    @writes
     def store_event(self, event: Event) -> None:
         try:
             conditions_id = self.get_conditions_id(event.conditions)
@@ -215,39 +404,115 @@ class SQLiteDatabase(Database):
             _logger.exception(f'Failed storing event into {self}: {event}!')
         cursor.close()
 
-    def get_events(self, group: Optional[str] = None, interval: Optional[int] = None) -> List[Event]:
+    @writes
+    def store_events(self, events: Iterable[Event], batch_size: int = 1000) -> None:
+        query = 'INSERT INTO events ' \
+                '(`event_id`, `item_name`, `old_state`, `new_state`, `timestamp`, `conditions_id`) VALUES ' \
+                '(NULL, ?, ?, ?, ?, ?)'
         cursor = self.connection.cursor()
-        if not interval:
-            query = 'SELECT `event_id`, `item_name`, `old_state`, `new_state`, `timestamp`, `conditions_id` ' \
-                    'FROM events'
-            data = None
+        iterator = iter(events)
+        while True:
+            batch = list(itertools.islice(iterator, batch_size))
+            if not batch:
+                break
+
+            # New condition sets are rare, so they are stored before (and not inside) the transaction of the batch.
+            data = []
+            for event in batch:
+                try:
+                    conditions_id = self.get_conditions_id(event.conditions)
+                except ValueError:
+                    conditions_id = self.store_conditions(event.conditions)
+                    if conditions_id == -1:  # something went wrong
+                        _logger.error(f'Failed storing event into {self}: {event}!')
+                        continue
+                item = event.item
+                data.append((item.name, item.old_state, item.new_state, event.timestamp, conditions_id))
+
+            try:
+                cursor.execute('BEGIN')
+                cursor.executemany(query, data)
+                cursor.execute('COMMIT')
+            except sqlite3.Error:
+                _logger.exception(f'Failed storing {len(data)} events into {self}!')
+                if self.connection.in_transaction:
+                    cursor.execute('ROLLBACK')
+        cursor.close()
+
+    def iter_events(self, group: Optional[str] = None, interval: Optional[int] = None,
+                    after: Optional[int] = None) -> Iterator[Event]:
+        # Only valid events are selected (see ITEM_LIST.is_valid and __create_item_list_tables).
+        # While profiling, the invalid events of the range are selected as well, but only counted as events_filtered.
+        count_filtered = METRICS.enabled
+        join = 'LEFT JOIN' if count_filtered else 'JOIN'
+        valid_clauses = [
+            'e.`old_state` NOT IN (SELECT `state` FROM temp.`rejected_states`)',
+            'e.`new_state` NOT IN (SELECT `state` FROM temp.`rejected_states`)',
+        ]
+        joins = f' {join} temp.`accepted_states` a ON a.`item_name` = e.`item_name` AND a.`state` = e.`new_state`'
+        valid_clauses.append('a.`item_name` IS NOT NULL')
+        data = ()
+        if group is not None:
+            joins += f' {join} temp.`item_groups` g ON g.`item_name` = e.`item_name` AND g.`group` = ?'
+            valid_clauses.append('g.`item_name` IS NOT NULL')
+            data += (group,)
+        range_clauses = []
+        if interval:
+            range_clauses.append('e.`timestamp` BETWEEN ? AND ?')
+            data += (datetime.datetime.now() - datetime.timedelta(days=interval), datetime.datetime.now())
+        if after:
+            range_clauses.append('e.`event_id` > ?')
+            data += (after,)
+
+        query = 'SELECT e.`event_id`, e.`item_name`, e.`old_state`, e.`new_state`, e.`timestamp`, e.`conditions_id`'
+        if count_filtered:
+            query += ', ' + ' AND '.join(valid_clauses) + f' FROM events e{joins}'
+            clauses = range_clauses
         else:
-            query = 'SELECT `event_id`, `item_name`, `old_state`, `new_state`, `timestamp`, `conditions_id` ' \
-                    'FROM events WHERE `timestamp` BETWEEN ? AND ? ORDER BY `event_id`'
-            data = (datetime.datetime.now() - datetime.timedelta(days=interval), datetime.datetime.now())
+            query += f', 1 FROM events e{joins}'
+            clauses = valid_clauses + range_clauses
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        query += ' ORDER BY e.`event_id`'
 
+        cursor = self.connection.cursor()
         try:
-            if data:
-                cursor.execute(query, data)
-            else:
-                cursor.execute(query)
+            cursor.execute(query, data)
         except sqlite3.Error:
-            _logger.exception(f'Could not get events from {self} for group "{group}" and interval={interval}!')
+            _logger.exception(f'Could not get events from {self} for group "{group}", interval={interval} '
+                              f'and after={after}!')
             cursor.close()
-            return []
+            return
 
-        events = []
-        for event_id, item_name, old_state, new_state, timestamp, conditions_id in cursor.fetchall():
-            if not ITEM_LIST.is_valid(item_name, old_state, new_state, group):
-                continue
+        self.__prefetch_conditions()
+        number_of_filtered_events = 0
+        try:
+            for event_id, item_name, old_state, new_state, timestamp, conditions_id, valid in cursor:
+                if not valid:
+                    number_of_filtered_events += 1
+                    continue
+                conditions = self.get_conditions(conditions_id)
+                item = Item(item_name, old_state, new_state)
+                yield Event(item, timestamp, conditions, event_id)
+        finally:
+            cursor.close()
+            if count_filtered:
+                METRICS.add('events_filtered', number_of_filtered_events)
+
+    def get_number_of_events(self) -> int:
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute('SELECT COUNT(*) FROM events')
+        except sqlite3.Error:
+            _logger.exception(f'Failed counting the events of {self}!')
+            cursor.close()
+            return -1
 
-            conditions = self.get_conditions(conditions_id)
-            item = Item(item_name, old_state, new_state)
-            event = Event(item, timestamp, conditions, event_id)
-            events.append(event)
+        number_of_events = cursor.fetchone()[0]
         cursor.close()
-        return events
+        return number_of_events
 
+    @writes
     def store_event_sequence(self, event_sequence: EventSequence, group: str) -> None:
         if len(event_sequence) < 2:  # do not store useless event sequences
             _logger.debug(f'Skipped storing useless event sequence (node-count={event_sequence.number_of_nodes()}).')
@@ -267,23 +532,81 @@ class SQLiteDatabase(Database):
         query = 'INSERT INTO `event_sequence_data` ' \
                 '(`event_sequence_id`, `event_u_id`, `event_u_occurrence`, ' \
                 '`event_v_id`, `event_v_occurrence`, `weight`) VALUES (?, ?, ?, ?, ?, ?)'
+        data = self._event_sequence_data(event_sequence, event_sequence_id)
+        try:
+            cursor.executemany(query, data)
+        except sqlite3.Error:
+            _logger.exception(f'Failed storing new event sequence into {self} for group "{group}"!')
 
-        data = []
-        for event_u, event_v, d in event_sequence.edges(data=True):
-            if d['weight'] == 0:  # do not store zero edges
-                continue
+        cursor.close()
 
-            event_u_o = event_sequence.nodes[event_u]['occurrence']
-            event_v_o = event_sequence.nodes[event_v]['occurrence']
-            data.append((event_sequence_id, event_u.id, event_u_o, event_v.id, event_v_o, d['weight']))
+    @writes
+    def update_event_sequence(self, event_sequence: EventSequence) -> None:
+        cursor = self.connection.cursor()
+        query = 'DELETE FROM `event_sequence_data` WHERE `event_sequence_id` = ?'
+        data = (event_sequence.id,)
+        try:
+            cursor.execute(query, data)
+        except sqlite3.Error:
+            _logger.exception(f'Failed updating event sequence ({event_sequence.id}) in {self}!')
+            cursor.close()
+            return
 
+        query = 'INSERT INTO `event_sequence_data` ' \
+                '(`event_sequence_id`, `event_u_id`, `event_u_occurrence`, ' \
+                '`event_v_id`, `event_v_occurrence`, `weight`) VALUES (?, ?, ?, ?, ?, ?)'
+        data = self._event_sequence_data(event_sequence, event_sequence.id)
         try:
             cursor.executemany(query, data)
         except sqlite3.Error:
-            _logger.exception(f'Failed storing new event sequence into {self} for group "{group}"!')
+            _logger.exception(f'Failed updating event sequence ({event_sequence.id}) in {self}!')
 
         cursor.close()
 
+    @writes
+    def store_event_sequences(self, group: str, event_sequences: Iterable[EventSequence],
+                              changed_event_sequences: Iterable[EventSequence] = (), event_delay: Optional[int] = None,
+                              high_water_mark: Optional[int] = None) -> None:
+        event_sequences = [event_sequence for event_sequence in event_sequences
+                           if len(event_sequence) >= 2]  # do not store useless event sequences
+        changed_event_sequences = list(changed_event_sequences)
+        cursor = self.connection.cursor()
+        try:
+            # The ids of the new event sequences are assigned here, so the write lock is taken right away.
+            cursor.execute('BEGIN IMMEDIATE')
+            if event_delay is not None:
+                cursor.execute('INSERT OR REPLACE INTO `event_delays` (`group`, `value`) VALUES (?, ?)',
+                               (group, event_delay))
+
+            cursor.executemany('DELETE FROM `event_sequence_data` WHERE `event_sequence_id` = ?',
+                               [(event_sequence.id,) for event_sequence in changed_event_sequences])
+            data = []
+            for event_sequence in changed_event_sequences:
+                data.extend(self._event_sequence_data(event_sequence, event_sequence.id))
+
+            cursor.execute('SELECT MAX(`event_sequence_id`) FROM `event_sequences`')
+            first_id = (cursor.fetchone()[0] or 0) + 1
+            ids = range(first_id, first_id + len(event_sequences))
+            cursor.executemany('INSERT INTO `event_sequences` (`event_sequence_id`, `group`) VALUES (?, ?)',
+                               [(event_sequence_id, group) for event_sequence_id in ids])
+            for event_sequence_id, event_sequence in zip(ids, event_sequences):
+                data.extend(self._event_sequence_data(event_sequence, event_sequence_id))
+
+            cursor.executemany('INSERT INTO `event_sequence_data` '
+                               '(`event_sequence_id`, `event_u_id`, `event_u_occurrence`, '
+                               '`event_v_id`, `event_v_occurrence`, `weight`) VALUES (?, ?, ?, ?, ?, ?)', data)
+            if high_water_mark is not None:
+                cursor.execute('INSERT OR REPLACE INTO `high_water_marks` (`group`, `event_id`) VALUES (?, ?)',
+                               (group, high_water_mark))
+            cursor.execute('COMMIT')
+        except sqlite3.Error:
+            _logger.exception(f'Failed storing event sequences into {self} for group "{group}"!')
+            if self.connection.in_transaction:
+                cursor.execute('ROLLBACK')
+        finally:
+            cursor.close()
+
+    @writes
     def store_event_delay(self, group: str, value: int) -> None:
         cursor = self.connection.cursor()
         query = 'INSERT OR REPLACE INTO `event_delays` (`group`, `value`) VALUES (?, ?)'
@@ -305,16 +628,62 @@ class SQLiteDatabase(Database):
             cursor.close()
             return 0
 
-        event_delay = cursor.fetchone()[0]
+        row = cursor.fetchone()
+        cursor.close()
+        if row is None:  # nothing learned yet
+            return 0
+        return row[0]
+
+    @writes
+    def store_high_water_mark(self, group: str, event_id: int) -> None:
+        cursor = self.connection.cursor()
+        query = 'INSERT OR REPLACE INTO `high_water_marks` (`group`, `event_id`) VALUES (?, ?)'
+        data = (group, event_id)
+        try:
+            cursor.execute(query, data)
+        except sqlite3.Error:
+            _logger.exception(f'Failed storing high-water mark={event_id} for group "{group}"!')
         cursor.close()
-        return event_delay
 
-    def get_event_sequences(self, group: str) -> Dict[FrozenSet[Condition], List[EventSequence]]:
-        events = {event.id: event for event in self.get_events(group)}
+    def get_high_water_mark(self, group: str) -> int:
         cursor = self.connection.cursor()
-        query = 'SELECT `event_sequence_id` FROM `event_sequences` WHERE `group` = ?'
+        query = 'SELECT `event_id` FROM `high_water_marks` WHERE `group` = ?'
         data = (group,)
+        try:
+            cursor.execute(query, data)
+        except sqlite3.Error:
+            _logger.exception(f'Failed getting high-water mark for group "{group}"!')
+            cursor.close()
+            return 0
 
+        row = cursor.fetchone()
+        cursor.close()
+        if row is None:  # nothing processed yet
+            return 0
+        return row[0]
+
+    def get_event_sequences(self, group: str, compact: bool = False
+                            ) -> Dict[FrozenSet[Condition], List[Union[EventSequence, CompactEventSequence]]]:
+        # The events are resolved by the same query, only the valid events of the group are joined
+        # (see iter_events), so an event sequence with an invalid event has NULL columns for that event.
+        valid = 'EXISTS (SELECT 1 FROM temp.`accepted_states` a WHERE a.`item_name` = {0}.`item_name` ' \
+                '       AND a.`state` = {0}.`new_state`) ' \
+                'AND EXISTS (SELECT 1 FROM temp.`item_groups` g WHERE g.`item_name` = {0}.`item_name` ' \
+                '            AND g.`group` = s.`group`) ' \
+                'AND {0}.`old_state` NOT IN (SELECT `state` FROM temp.`rejected_states`) ' \
+                'AND {0}.`new_state` NOT IN (SELECT `state` FROM temp.`rejected_states`)'
+        query = 'SELECT d.`event_sequence_id`, d.`event_u_id`, d.`event_u_occurrence`, ' \
+                'd.`event_v_id`, d.`event_v_occurrence`, d.`weight`, ' \
+                'u.`item_name`, u.`old_state`, u.`new_state`, u.`timestamp`, u.`conditions_id`, ' \
+                'v.`item_name`, v.`old_state`, v.`new_state`, v.`timestamp`, v.`conditions_id` ' \
+                'FROM `event_sequences` s ' \
+                'JOIN `event_sequence_data` d ON d.`event_sequence_id` = s.`event_sequence_id` ' \
+                f'LEFT JOIN `events` u ON u.`event_id` = d.`event_u_id` AND {valid.format("u")} ' \
+                f'LEFT JOIN `events` v ON v.`event_id` = d.`event_v_id` AND {valid.format("v")} ' \
+                'WHERE s.`group` = ? ' \
+                'ORDER BY d.`event_sequence_id`, d.`event_u_id`, d.`event_v_id`'
+        data = (group,)
+        cursor = self.connection.cursor()
         try:
             cursor.execute(query, data)
         except sqlite3.Error:
@@ -322,31 +691,29 @@ class SQLiteDatabase(Database):
             cursor.close()
             return {}
 
-        event_sequences = {}
-        for event_sequence_id, in cursor.fetchall():
-            query = 'SELECT `event_u_id`, `event_u_occurrence`, `event_v_id`, `event_v_occurrence`, ' \
-                    '`weight` FROM `event_sequence_data` WHERE `event_sequence_id` = ?'
-            data = (event_sequence_id,)
+        self.__prefetch_conditions()
+        events: Dict[int, Event] = {}  # events shared by event sequences are created once
 
-            try:
-                cursor.execute(query, data)
-            except sqlite3.Error:
-                _logger.exception(f'Failed getting event sequence ({event_sequence_id}) data for group "{group}"!')
-                continue
+        def event(event_id: int, item_name: Optional[str], old_state: str, new_state: str,
+                  timestamp: datetime.datetime, conditions_id: int) -> Event:
+            if item_name is None:
+                raise KeyError(event_id)
+            if event_id not in events:
+                item = Item(item_name, old_state, new_state)
+                events[event_id] = Event(item, timestamp, self.get_conditions(conditions_id), event_id)
+            return events[event_id]
 
-            event_sequence = EventSequence(event_sequence_id)
+        event_sequences = {}
+        for event_sequence_id, group_rows in itertools.groupby(cursor, key=operator.itemgetter(0)):
+            rows = []
             try:
-                for eu_id, euo, ev_id, evo, w in cursor.fetchall():
-                    event_u = events[eu_id]
-                    event_v = events[ev_id]
-
-                    event_sequence.add_node(event_u, occurrence=euo)
-                    event_sequence.add_node(event_v, occurrence=evo)
-                    event_sequence.add_edge(event_u, event_v, weight=w)
+                for _, eu_id, euo, ev_id, evo, w, *columns in group_rows:
+                    rows.append((event(eu_id, *columns[:5]), euo, event(ev_id, *columns[5:]), evo, w))
             except KeyError:
                 _logger.exception(f'Invalid event sequence! Some events where not found but declared! - Skipping')
                 continue
 
+            event_sequence = self._event_sequence(event_sequence_id, rows, compact)
             if event_sequence.conditions not in event_sequences:
                 event_sequences[event_sequence.conditions] = []
 
@@ -354,14 +721,17 @@ class SQLiteDatabase(Database):
         cursor.close()
         return event_sequences
 
+    @writes
     def clear_learned(self, database_name: str) -> None:
-        tables = ('event_sequences', 'event_sequence_data', 'event_delays')
+        # The tables are emptied instead of dropped, so their schema (e.g. indexes) stays as migrated.
+        tables = ('event_sequences', 'event_sequence_data', 'event_delays', 'high_water_marks')
         cursor = self.connection.cursor()
+        cursor.execute('BEGIN')
         for table_name in tables:
-            query = f'DROP TABLE IF EXISTS {table_name}'
+            query = f'DELETE FROM `{table_name}`'
             try:
                 cursor.execute(query)
             except sqlite3.Error:
-                _logger.exception(f'Failed clearing table {table_name}!')
+                _logger.exception(f'Failed clearing table {table_name} of database "{database_name}"!')
+        cursor.execute('COMMIT')
         cursor.close()
-        self.__create_tables(database_name)
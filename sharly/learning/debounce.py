@@ -0,0 +1,146 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+    from sharly.model.condition import Condition
+
+# Builtin Imports
+import array
+import dataclasses
+import datetime
+import itertools
+import logging
+
+# Library Imports
+import numpy
+
+# Project Imports
+from sharly.model.event import Event, Item
+from sharly.util.config import CONFIG
+from sharly.util.item_list import ITEM_LIST
+
+_logger = logging.getLogger(__name__)
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def encode_events(events: Iterable[Event]
+                  ) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray, List[Item],
+                             List[FrozenSet[Condition]]]:
+    """Convert events into arrays in a single pass.
+
+    Events are equal if their items are equal, so the items are encoded as integers (codes).
+    The names of the items are encoded separately, because an item is debounced regardless of its states.
+    The conditions are kept as references, so the events can be decoded again (see DebouncedEvents.events).
+
+    Parameters
+    ----------
+    events
+        The events in order of their occurrence (may be consumed lazily).
+
+    Returns
+    -------
+    The ids, item codes, name codes, timestamps (in microseconds) of the events, the debounce window
+    (in microseconds) of each name code, the item of each item code and the conditions of the events.
+    """
+    item_index: Dict[Item, int] = {}
+    name_index: Dict[str, int] = {}
+    ids = array.array('q')
+    codes = array.array('q')
+    names = array.array('q')
+    timestamps = array.array('q')
+    conditions: List[FrozenSet[Condition]] = []
+    for event in events:
+        ids.append(event.id)
+        conditions.append(event.conditions)
+        codes.append(item_index.setdefault(event.item, len(item_index)))
+        names.append(name_index.setdefault(event.item.name, len(name_index)))
+        timestamps.append((event.timestamp - _EPOCH) // _MICROSECOND)
+
+    windows = numpy.array([ITEM_LIST.get_debounce_window(name) * 1_000_000 for name in name_index], dtype=float)
+    return (numpy.frombuffer(ids, dtype=numpy.int64), numpy.frombuffer(codes, dtype=numpy.int64),
+            numpy.frombuffer(names, dtype=numpy.int64), numpy.frombuffer(timestamps, dtype=numpy.int64), windows,
+            list(item_index), conditions)
+
+
+def debounce_mask(codes: numpy.ndarray, names: numpy.ndarray, timestamps: numpy.ndarray,
+                  windows: numpy.ndarray) -> numpy.ndarray:
+    """Get the events, which pass the debouncing.
+
+    An event is skipped, if
+        - it repeats the previous event within T_inc or
+        - the previous event of the same item (in any state) occurred within the debounce window of the item.
+    The second rule also catches flapping sensors, whose events are interleaved with events of other items.
+
+    Parameters
+    ----------
+    codes
+        The item codes of the events.
+    names
+        The name codes of the events.
+    timestamps
+        The timestamps of the events (in microseconds).
+    windows
+        The debounce window of each name code (in microseconds, 0 = no debouncing).
+
+    Returns
+    -------
+    A boolean mask, which is True for each event to keep.
+    """
+    keep = numpy.ones(len(codes), dtype=bool)
+    keep[1:] = (codes[1:] != codes[:-1]) | (numpy.diff(timestamps) >= CONFIG.t_inc * 1_000_000)
+
+    if numpy.any(windows > 0):
+        order = numpy.argsort(names, kind='stable')
+        later, earlier = order[1:], order[:-1]
+        same = names[later] == names[earlier]
+        later, earlier = later[same], earlier[same]
+        window = windows[names[later]]
+        keep[later[(window > 0) & (timestamps[later] - timestamps[earlier] < window)]] = False
+    return keep
+
+
+@dataclasses.dataclass
+class DebouncedEvents:
+    """The debounced events of a group as arrays (see debounce_events)."""
+    codes: numpy.ndarray  # item codes of the kept events
+    timestamps: numpy.ndarray  # timestamps (in microseconds) of the kept events
+    ids: numpy.ndarray  # ids of the kept events
+    items: List[Item]  # item of each item code
+    conditions: List[FrozenSet[Condition]]  # conditions of the kept events (shared with the loaded events)
+    dropped_ids: numpy.ndarray  # ascending ids of the skipped events
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def events(self) -> Generator[Event, None, None]:
+        """Decode the kept events again, e.g. to segment exactly the events, which were loaded and debounced."""
+        for event_id, code, timestamp, conditions in zip(self.ids.tolist(), self.codes.tolist(),
+                                                         self.timestamps.tolist(), self.conditions):
+            yield Event(self.items[code], _EPOCH + timestamp * _MICROSECOND, conditions, event_id)
+
+
+def debounce_events(events: Iterable[Event]) -> DebouncedEvents:
+    """Debounce events in a single pass (see debounce_mask).
+
+    Parameters
+    ----------
+    events
+        The events in order of their occurrence (may be consumed lazily).
+
+    Returns
+    -------
+    The kept events as arrays.
+    """
+    ids, codes, names, timestamps, windows, items, conditions = encode_events(events)
+    keep = debounce_mask(codes, names, timestamps, windows)
+    return DebouncedEvents(
+        codes[keep], timestamps[keep], ids[keep], items, list(itertools.compress(conditions, keep.tolist())),
+        ids[~keep]
+    )
+
@@ -0,0 +1,175 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+
+# Builtin Imports
+import logging
+
+# Library Imports
+import numpy
+
+# Project Imports
+# […]
+
+_logger = logging.getLogger(__name__)
+
+
+class PairCurve:
+    """The number of event-pairs over all event sequences as a function of the event delay T.
+
+    Generating the event sequences for every candidate T is expensive, because it rebuilds every graph.
+    Instead, this class derives all sequence boundaries from two arrays (inter-event gaps and the positions
+    at which an event repeats inside a sequence), which only have to be computed once for all candidates.
+
+    An event sequence of k events holds k * (k - 1) / 2 pairs, because every event is (at least virtually)
+    connected with all of its predecessors (see EventSequence.add_event). A new sequence starts, if
+        - the gap to the previous event is greater than T,
+        - the event is already part of the current sequence or
+        - the sequence reached its maximum length or time span (if limited).
+    The first condition only depends on T, the others do not. Within a run of events separated by gaps
+    of at most T, the sequence starts therefore form a chain s -> cut[s], where cut[s] is the first position
+    that repeats an event of [s, cut[s]) or exceeds the limits of a sequence starting at s.
+    The chain of a run is walked with binary lifting, so the number of pairs for any T is computed
+    with a few vectorized operations.
+
+    The curve is built from the arrays of the debounced events (see debounce_events), so the events
+    may be streamed from the database.
+    """
+    def __init__(self, codes: numpy.ndarray, timestamps: numpy.ndarray, max_length: int = 0, max_span: int = 0
+                 ) -> None:
+        """Create the curve of a group.
+
+        Parameters
+        ----------
+        codes
+            The item codes of the debounced events in order of their occurrence (see debounce_events).
+        timestamps
+            The timestamps of the debounced events (in microseconds).
+        max_length
+            The maximum number of events of a sequence (default = 0, unlimited).
+        max_span
+            The maximum time (in sec) between the first and the last event of a sequence (default = 0, unlimited).
+        """
+        self._size = len(codes)
+        self._gaps = numpy.diff(timestamps)
+        self._jumps, self._weights = self.__build_chains(codes, timestamps, max_length, max_span)
+        self._cache: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def number_of_evaluations(self) -> int:
+        """The number of distinct T, for which the number of pairs was calculated."""
+        return len(self._cache)
+
+    def __getitem__(self, t: int) -> int:
+        """Get the number of event-pairs over all event sequences for an event delay of t seconds."""
+        try:
+            return self._cache[t]
+        except KeyError:
+            number_of_pairs = self.__number_of_pairs(t)
+            self._cache[t] = number_of_pairs
+            return number_of_pairs
+
+    def __build_chains(self, codes: numpy.ndarray, timestamps: numpy.ndarray, max_length: int, max_span: int
+                       ) -> Tuple[List[numpy.ndarray], numpy.ndarray]:
+        """Build the binary lifting tables of the chain s -> cut[s] and the accumulated pairs along it.
+
+        Parameters
+        ----------
+        codes
+            The item codes of the events.
+        timestamps
+            The timestamps of the events (in microseconds).
+        max_length
+            The maximum number of events of a sequence (0 = unlimited).
+        max_span
+            The maximum time (in sec) between the first and the last event of a sequence (0 = unlimited).
+
+        Returns
+        -------
+        The jump tables (level k jumps 2^k sequence starts) and the number of pairs from s to the chain end.
+        """
+        n = self._size
+        dtype = numpy.int32 if n < numpy.iinfo(numpy.int32).max else numpy.int64
+        positions = numpy.arange(n + 1, dtype=dtype)
+
+        # The next position of the same event (n, if there is none).
+        order = numpy.argsort(codes, kind='stable')
+        same = codes[order[1:]] == codes[order[:-1]]
+        next_same = numpy.full(n + 1, n, dtype=dtype)
+        next_same[order[:-1][same]] = order[1:][same]
+
+        # cut[s] = min(next_same[s:]) is the first position, which repeats an event of [s, cut[s]).
+        cut = numpy.minimum.accumulate(next_same[::-1])[::-1]
+
+        if max_length:
+            cut = numpy.minimum(cut, numpy.minimum(positions + max_length, n).astype(dtype))
+
+        if max_span and n:
+            cut[:n] = numpy.minimum(cut[:n], self.__span_cut(timestamps, cut, max_span * 1_000_000))
+
+        lengths = (cut - positions).astype(numpy.int64)
+        weights = lengths * (lengths - 1) // 2
+        weights[n] = 0
+
+        jumps = [cut]
+        jump = cut
+        while numpy.any(jump[:n] < n):
+            weights = weights + weights[jump]
+            jump = jump[jump]
+            jumps.append(jump)
+        return jumps, weights
+
+    @staticmethod
+    def __span_cut(timestamps: numpy.ndarray, cut: numpy.ndarray, max_span: int) -> numpy.ndarray:
+        """Get the first position of each event, which is more than max_span (in microseconds) after it.
+
+        Positions after cut[s] are irrelevant, so the fallback for unordered timestamps only scans up to there.
+        """
+        n = len(timestamps)
+        if numpy.all(timestamps[1:] >= timestamps[:-1]):
+            return numpy.searchsorted(timestamps, timestamps + max_span, side='right')
+
+        span_cut = numpy.empty(n, dtype=cut.dtype)
+        for s in range(n):
+            i = s + 1
+            while i < cut[s] and timestamps[i] - timestamps[s] <= max_span:
+                i += 1
+            span_cut[s] = i
+        return span_cut
+
+    def __number_of_pairs(self, t: int) -> int:
+        """Calculate the number of pairs of events over all event sequences.
+
+        Parameters
+        ----------
+        t
+            Time which is allowed to pass between two events to belong to the same sequence.
+
+        Returns
+        -------
+        Number of event-pairs for all sequences.
+        """
+        if not self._size:
+            return 0
+
+        # Runs of events which are not separated by gaps greater than t.
+        starts = numpy.concatenate(([0], numpy.flatnonzero(self._gaps > t * 1_000_000) + 1))
+        ends = numpy.append(starts[1:], self._size)
+
+        # Find the last sequence start of each run.
+        last = starts
+        for jump in reversed(self._jumps):
+            candidate = jump[last]
+            last = numpy.where(candidate < ends, candidate, last)
+
+        lengths = ends - last
+        full_pairs = self._weights[starts] - self._weights[last]
+        return int(full_pairs.sum() + (lengths * (lengths - 1) // 2).sum())
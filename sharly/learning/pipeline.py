@@ -0,0 +1,205 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+
+# Builtin Imports
+import abc
+import collections.abc
+import dataclasses
+import logging
+import time
+
+# Library Imports
+# […]
+
+# Project Imports
+# […]
+
+_logger = logging.getLogger(__name__)
+
+
+class Stage(abc.ABC):
+    """A named step of a pipeline.
+
+    A stage gets the output of the previous stage and returns its own output, which may be an iterator
+    that is consumed lazily by the next stage. Returning None stops the pipeline (there is nothing left to do).
+    Stages, which write into the database, have to set writes, because they may only run in the main process.
+    """
+    name: str = ''
+    writes: bool = False
+
+    @abc.abstractmethod
+    def run(self, context: Any, data: Any) -> Any:
+        """Run the stage.
+
+        Parameters
+        ----------
+        context
+            The state shared by all stages of a pipeline run.
+        data
+            The output of the previous stage (None for the first stage).
+
+        Returns
+        -------
+        The output of the stage or None, if the pipeline should stop.
+        """
+
+
+@dataclasses.dataclass
+class StageStatistics:
+    """The wall time and the number of items, which went in and out of a stage."""
+    name: str
+    seconds: float = 0.0
+    items_in: int = 0
+    items_out: int = 0
+
+    def add(self, other: StageStatistics) -> None:
+        self.seconds += other.seconds
+        self.items_in += other.items_in
+        self.items_out += other.items_out
+
+
+class Pipeline:
+    """An ordered list of replaceable stages, which measures each stage.
+
+    Iterators, which are passed from one stage to the next, are consumed lazily. The time spent in
+    an iterator is accounted to the stage which returned it, not to the stage which consumes it,
+    so the time of each stage does not include the time of the stages before.
+    """
+    def __init__(self, stages: Iterable[Stage]) -> None:
+        self._stages: List[Stage] = list(stages)
+        self._statistics: Dict[str, StageStatistics] = {}
+        self._timers: List[List[float]] = []  # start and time of nested measurements of the running measurements
+
+    @property
+    def stages(self) -> List[str]:
+        """The names of the stages in order."""
+        return [stage.name for stage in self._stages]
+
+    @property
+    def first_writing_stage(self) -> Optional[str]:
+        """The name of the first stage, which writes into the database (None, if no stage writes)."""
+        for stage in self._stages:
+            if stage.writes:
+                return stage.name
+        return None
+
+    @property
+    def statistics(self) -> List[StageStatistics]:
+        """The accumulated statistics of all runs in order of the stages."""
+        return [self._statistics[stage.name] for stage in self._stages if stage.name in self._statistics]
+
+    def clear_statistics(self) -> None:
+        self._statistics.clear()
+
+    def add_statistics(self, statistics: Iterable[StageStatistics]) -> None:
+        """Add statistics, e.g. of a pipeline run in another process."""
+        for stage_statistics in statistics:
+            self._statistics.setdefault(stage_statistics.name, StageStatistics(stage_statistics.name)).add(
+                stage_statistics)
+
+    def replace(self, name: str, stage: Stage) -> None:
+        """Replace a stage.
+
+        Raises
+        ------
+        KeyError, if there is no such stage.
+        """
+        self._stages[self.__index(name)] = stage
+
+    def remove(self, name: str) -> None:
+        """Remove (skip) a stage. The next stage gets the output of the previous one.
+
+        Raises
+        ------
+        KeyError, if there is no such stage.
+        """
+        del self._stages[self.__index(name)]
+
+    def run(self, context: Any, data: Any = None, start: Optional[str] = None, stop: Optional[str] = None) -> Any:
+        """Run the stages.
+
+        Parameters
+        ----------
+        context
+            The state shared by all stages of this run.
+        data
+            The input of the first stage.
+        start
+            The name of the first stage to run (default = the first stage).
+        stop
+            The name of the stage to stop before (default = run to the end).
+
+        Returns
+        -------
+        The output of the last stage or None, if a stage stopped the pipeline.
+        """
+        first = self.__index(start) if start is not None else 0
+        last = self.__index(stop) if stop is not None else len(self._stages)
+
+        producer: Optional[StageStatistics] = None
+        for stage in self._stages[first:last]:
+            consumer = self._statistics.setdefault(stage.name, StageStatistics(stage.name))
+            data = self.__hand_over(data, producer, consumer)
+
+            self.__start_timer()
+            try:
+                data = stage.run(context, data)
+            finally:
+                self.__stop_timer(consumer)
+
+            if data is None:
+                return None
+            producer = consumer
+        return self.__hand_over(data, producer, None)
+
+    def __index(self, name: str) -> int:
+        for i, stage in enumerate(self._stages):
+            if stage.name == name:
+                return i
+        raise KeyError(f'No stage "{name}" in pipeline {self.stages}!')
+
+    def __hand_over(self, data: Any, producer: Optional[StageStatistics], consumer: Optional[StageStatistics]) -> Any:
+        """Count the items, which are passed from one stage to the next."""
+        if isinstance(data, collections.abc.Iterator):
+            return self.__iterate(data, producer, consumer)
+
+        number_of_items = len(data) if isinstance(data, collections.abc.Sized) else int(data is not None)
+        if producer is not None:
+            producer.items_out += number_of_items
+        if consumer is not None:
+            consumer.items_in += number_of_items
+        return data
+
+    def __iterate(self, iterator: Iterator[Any], producer: Optional[StageStatistics],
+                  consumer: Optional[StageStatistics]) -> Generator[Any, None, None]:
+        while True:
+            self.__start_timer()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.__stop_timer(producer)
+
+            if producer is not None:
+                producer.items_out += 1
+            if consumer is not None:
+                consumer.items_in += 1
+            yield item
+
+    def __start_timer(self) -> None:
+        self._timers.append([time.perf_counter(), 0.0])
+
+    def __stop_timer(self, statistics: Optional[StageStatistics]) -> None:
+        start, nested = self._timers.pop()
+        elapsed = time.perf_counter() - start
+        if self._timers:
+            self._timers[-1][1] += elapsed
+        if statistics is not None:
+            statistics.seconds += elapsed - nested
@@ -0,0 +1,158 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+    from sharly.model.condition import Condition
+    from sharly.model.event import Event
+
+# Builtin Imports
+import logging
+
+# Library Imports
+# […]
+
+# Project Imports
+from sharly.model.event_sequence import EventSequence
+
+_logger = logging.getLogger(__name__)
+
+
+class EventSequenceBuilder:
+    """The events of an event sequence in order of their occurrence.
+
+    The builder follows the same rules as EventSequence.add_event, but only records the events.
+    The graph is built once it is actually needed (see build), so counting or comparing
+    generated event sequences does not allocate any graph objects.
+    """
+    __slots__ = ('_event_delay', '_max_length', '_max_span', '_events', '_members')
+
+    def __init__(self, event_delay: int, max_length: int = 0, max_span: int = 0) -> None:
+        self._event_delay = event_delay
+        self._max_length = max_length
+        self._max_span = max_span
+        self._events: List[Event] = []
+        self._members: Set[Event] = set()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(self._events)
+
+    def __contains__(self, event: Event) -> bool:
+        return event in self._members
+
+    @property
+    def root(self) -> Optional[Event]:
+        return self._events[0] if self._events else None
+
+    @property
+    def predecessor(self) -> Optional[Event]:
+        return self._events[-1] if self._events else None
+
+    @property
+    def conditions(self) -> FrozenSet[Condition]:
+        try:
+            return self.root.conditions
+        except AttributeError:
+            return frozenset()
+
+    @property
+    def fingerprint(self) -> Tuple[FrozenSet[Condition], FrozenSet[Event], FrozenSet[Tuple[Event, Event]]]:
+        """The fingerprint of the built event sequence (see EventSequence.fingerprint).
+
+        Only the edges between consecutive events have a positive weight in a new event sequence.
+        """
+        edges = frozenset(zip(self._events, self._events[1:]))
+        return self.conditions, frozenset(self._members), edges
+
+    def number_of_pairs(self) -> int:
+        """Get the number of event-pairs (each event is paired with all of its predecessors)."""
+        n = len(self._events)
+        return n * (n - 1) // 2
+
+    def add_event(self, event: Event) -> bool:
+        """Add an event (see EventSequence.add_event).
+
+        Parameters
+        ----------
+        event
+            The event to add.
+
+        Returns
+        -------
+        True, if the event was added, False otherwise.
+        """
+        if event in self._members:
+            return False
+
+        if self._events:
+            if (event.timestamp - self._events[-1].timestamp).total_seconds() > self._event_delay:
+                return False
+
+            if self._max_length and len(self._events) >= self._max_length:
+                return False
+
+            if self._max_span and (event.timestamp - self._events[0].timestamp).total_seconds() > self._max_span:
+                return False
+
+        self._events.append(event)
+        self._members.add(event)
+        return True
+
+    def build(self) -> EventSequence:
+        """Build the event sequence graph."""
+        event_sequence = EventSequence()
+        for event in self._events:
+            event_sequence.add_event(event, self._event_delay, self._max_length, self._max_span)
+        return event_sequence
+
+    def merge_into(self, event_sequence: EventSequence) -> None:
+        """Add the occurrences and weights of the built event sequence to an equal event sequence in place.
+
+        This is the same as event_sequence.merge(self.build()), without building the graph.
+
+        Parameters
+        ----------
+        event_sequence
+            The event sequence to merge into, which must have the same fingerprint.
+        """
+        for event in self._events:
+            event_sequence.nodes[event]['occurrence'] += 1
+
+        for event_u, event_v in zip(self._events, self._events[1:]):
+            event_sequence[event_u][event_v]['weight'] += 1
+
+
+def generate_event_sequences(events: Iterable[Event], event_delay: int, max_length: int = 0, max_span: int = 0
+                             ) -> Generator[EventSequenceBuilder, None, None]:
+    """Generate event sequences.
+
+    Parameters
+    ----------
+    events
+        Debounced events to use (may be consumed lazily, see sharly.learning.debounce).
+    event_delay
+        Time which is allowed to pass between two events to belong to the same sequence.
+    max_length
+        The maximum number of events of a sequence (default = 0, unlimited).
+    max_span
+        The maximum time (in sec) between the first and the last event of a sequence (default = 0, unlimited).
+
+    Returns
+    -------
+    Builders of the generated sequences.
+    """
+    event_sequence = EventSequenceBuilder(event_delay, max_length, max_span)
+    for event in events:
+        if not event_sequence.add_event(event):
+            yield event_sequence
+            event_sequence = EventSequenceBuilder(event_delay, max_length, max_span)
+            event_sequence.add_event(event)
+
+    if event_sequence:
+        yield event_sequence
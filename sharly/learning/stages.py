@@ -0,0 +1,412 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+    from sharly.database import Database
+    from sharly.learning.debounce import DebouncedEvents
+    from sharly.model.event import Event
+
+# Builtin Imports
+import dataclasses
+import logging
+import os
+
+# Library Imports
+import matplotlib.pyplot as plt
+
+# Project Imports
+from sharly.learning.debounce import debounce_events
+from sharly.learning.event_delay import PairCurve
+from sharly.learning.pipeline import Pipeline, Stage
+from sharly.learning.segmentation import EventSequenceBuilder, generate_event_sequences
+from sharly.model.event_sequence import EventSequence
+from sharly.util.config import CONFIG
+from sharly.util.item_list import ITEM_LIST
+from sharly.util.metrics import METRICS
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass(frozen=True)
+class GroupTask:
+    """Everything needed to learn a group, independent of the process it is learned in."""
+    group: str
+    learning_interval: int
+    previous_event_delay: int = 0
+    high_water_mark: int = 0
+    incremental: bool = False
+
+
+@dataclasses.dataclass
+class GroupResult:
+    """The learned data of a group, which still has to be stored."""
+    group: str
+    event_delay: int
+    frame: Optional[Dict[int, int]]  # None, if the event delay was not calculated
+    event_sequences: List[EventSequence]
+    number_of_stored: int  # the first event sequences were already stored
+    changed: Set[int]  # indices of stored event sequences, which changed
+    high_water_mark: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.event_sequences)
+
+
+@dataclasses.dataclass
+class GroupContext:
+    """The state shared by the stages, which learn a group."""
+    database: Database
+    task: GroupTask
+    visualize: bool = False
+    visualize_zero_edges: bool = False
+    plot: bool = False
+
+    # Set by the stages
+    event_delay: int = 0
+    frame: Optional[Dict[int, int]] = None
+    open_sequence: List[EventSequenceBuilder] = dataclasses.field(default_factory=list)
+
+    @property
+    def group(self) -> str:
+        return self.task.group
+
+    @property
+    def sequence_limits(self) -> Tuple[int, int]:
+        return ITEM_LIST.get_sequence_limits(self.task.group)
+
+
+class LoadStage(Stage):
+    """Stream the events of the group from the database."""
+    name = 'load'
+
+    def run(self, context: GroupContext, data: None) -> Iterator[Event]:
+        task = context.task
+        if task.high_water_mark:
+            return context.database.iter_events(task.group, after=task.high_water_mark)
+        return context.database.iter_events(task.group, task.learning_interval)
+
+
+class DebounceStage(Stage):
+    """Debounce the events once for all following stages (see debounce_events)."""
+    name = 'debounce'
+
+    def run(self, context: GroupContext, events: Iterable[Event]) -> Optional[DebouncedEvents]:
+        task = context.task
+        debounced_events = debounce_events(events)
+        if not debounced_events:
+            if task.high_water_mark:
+                _logger.info(f'No new events found for group "{task.group}" since event {task.high_water_mark} '
+                             f'- skip.')
+            else:
+                _logger.info(f'No events found for group "{task.group}" in the last {task.learning_interval} days '
+                             f'- skip.')
+            return None
+
+        _logger.debug(f'Debouncing skipped {len(debounced_events.dropped_ids)} events of group "{task.group}".')
+        METRICS.add('events_debounced', len(debounced_events.dropped_ids))
+        return debounced_events
+
+
+class EventDelayStage(Stage):
+    """Calculate the event delay of the group (or continue with the stored one on incremental runs)."""
+    name = 'event_delay'
+
+    def run(self, context: GroupContext, debounced_events: DebouncedEvents) -> DebouncedEvents:
+        task = context.task
+        if task.high_water_mark:
+            context.event_delay = context.database.get_event_delay(task.group)
+            _logger.info(f'Continuing group "{task.group}" after event {task.high_water_mark} '
+                         f'with an event delay of {context.event_delay}s.')
+            return debounced_events
+
+        number_of_pairs = PairCurve(debounced_events.codes, debounced_events.timestamps, *context.sequence_limits)
+        context.frame = {}
+        context.event_delay = self.__calculate_event_delay(number_of_pairs, context.frame, task.previous_event_delay)
+        METRICS.add('candidates_evaluated', number_of_pairs.number_of_evaluations)
+        _logger.info(f'Calculated best event delay for group "{task.group}": {context.event_delay}s')
+        return debounced_events
+
+    @classmethod
+    def __calculate_event_delay(cls, number_of_pairs: PairCurve, frame: Dict[int, int],
+                                previous_event_delay: int) -> int:
+        """Calculate the time (in sec) allowed to pass between two events, which fits best to represent user behaviour.
+
+        This method tries to find a parameter T, which separates the event sequences
+        in the best way. To do so, this method iteratively increases T until
+        the found sequences become stable.
+
+        On a warm start, the previous event delay of the group is checked first (see __recheck_event_delay).
+        The search starts from T_init only, if the previous event delay is not its result anymore.
+
+        Parameters
+        ----------
+        number_of_pairs
+            The number of event-pairs over all event sequences for each T.
+        frame
+            Structure to store data points.
+        previous_event_delay
+            The event delay of the previous run (0, if the search should start from T_init).
+
+        Returns
+        -------
+        The best event delay in seconds.
+        """
+        if previous_event_delay >= CONFIG.t_init:
+            if cls.__recheck_event_delay(number_of_pairs, previous_event_delay, frame):
+                _logger.debug(f'-> Previous event delay {previous_event_delay}s is still stable.')
+                return previous_event_delay
+            _logger.debug(f'-> Previous event delay {previous_event_delay}s moved, searching from t = {CONFIG.t_init}.')
+
+        t = CONFIG.t_init
+        while True:
+            stable, new_t = cls.__sequences_stable(number_of_pairs, t, frame)
+            if stable:
+                break
+            t = new_t
+        return t
+
+    @classmethod
+    def __recheck_event_delay(cls, number_of_pairs: PairCurve, event_delay: int, frame: Dict[int, int]) -> bool:
+        """Check if a previous event delay is still the result of the search from T_init.
+
+        The search from T_init steps through the candidates T_init + i * T_inc and returns the first one,
+        whose window of the following T_inc_stable seconds has no unstable pair-increment. So the previous
+        event delay is kept, if
+            - it is one of the candidates,
+            - the sequences are stable at the event delay,
+            - the pair-increment right before the event delay is unstable and
+            - there is no stable window before. Each window contains one of every k-th candidate
+              (k = T_inc_stable / T_inc), so only the stable pair-increments around those candidates are counted.
+        Otherwise, the curve has moved and the search has to start from T_init.
+
+        Parameters
+        ----------
+        number_of_pairs
+            The number of event-pairs over all event sequences for each T.
+        event_delay
+            The previous event delay.
+        frame
+            Structure to store data points.
+
+        Returns
+        -------
+        True, if the previous event delay is still the best event delay, False otherwise.
+        """
+        if (event_delay - CONFIG.t_init) % CONFIG.t_inc:
+            return False
+
+        stable, _ = cls.__sequences_stable(number_of_pairs, event_delay, frame)
+        if not stable:
+            return False
+
+        if event_delay == CONFIG.t_init:
+            return True
+
+        if cls.__increment_stable(number_of_pairs, event_delay - CONFIG.t_inc, frame):
+            return False
+
+        window = len(range(0, CONFIG.t_inc_stable, CONFIG.t_inc))
+        for t in range(CONFIG.t_init, event_delay - CONFIG.t_inc, window * CONFIG.t_inc):
+            # Count the stable pair-increments in a row around the candidate (up to a whole window).
+            stable_increments = 0
+            t_ = t
+            while stable_increments < window and t_ >= CONFIG.t_init and \
+                    cls.__increment_stable(number_of_pairs, t_, frame):
+                stable_increments += 1
+                t_ -= CONFIG.t_inc
+            t_ = t + CONFIG.t_inc
+            while 0 < stable_increments < window and cls.__increment_stable(number_of_pairs, t_, frame):
+                stable_increments += 1
+                t_ += CONFIG.t_inc
+
+            if stable_increments >= window:
+                return False
+        return True
+
+    @staticmethod
+    def __increment_stable(number_of_pairs: PairCurve, t: int, frame: Dict[int, int]) -> bool:
+        """Check if the number of event-pairs changes by at most N from t to t + T_inc."""
+        number_of_pairs_now = number_of_pairs[t]
+        frame.setdefault(t, number_of_pairs_now)
+        return abs(number_of_pairs_now - number_of_pairs[t + CONFIG.t_inc]) <= CONFIG.n
+
+    @staticmethod
+    def __sequences_stable(number_of_pairs: PairCurve, t: int, frame: Dict[int, int]) -> Tuple[bool, int]:
+        """Check if all sequences are stable with given time parameter.
+
+        Sequences are specified as stable if the amount of event-pairs does not
+        change more then N for all T'. N is a fixed preset parameter (see config).
+        T' is a value which is iterated from T to T + T_inc_stable.
+
+        Parameters
+        ----------
+        number_of_pairs
+            The number of event-pairs over all event sequences for each T.
+        t
+            Time which is allowed to pass between two events to belong to the same sequence.
+        frame
+            Structure to store data points.
+
+        Returns
+        -------
+        True, if sequences are stable, False otherwise plus the new T value.
+        """
+        _logger.debug(f'-> Checking if sequences are stable with t = {t}:')
+        for t_ in range(t, t + CONFIG.t_inc_stable, CONFIG.t_inc):
+            number_of_pairs_now = number_of_pairs[t_]
+            number_of_pairs_future = number_of_pairs[t_ + CONFIG.t_inc]
+            if t_ not in frame:
+                frame[t_] = number_of_pairs_now
+
+            if abs(number_of_pairs_now - number_of_pairs_future) > CONFIG.n:
+                _logger.debug(f'   No, found unstable pair-increment at t = {t_}')
+                return False, t_ + CONFIG.t_inc
+
+        _logger.debug(f'   Yes, stable')
+        return True, 0
+
+
+class SegmentStage(Stage):
+    """Split the debounced events into event sequences."""
+    name = 'segment'
+
+    def run(self, context: GroupContext, debounced_events: DebouncedEvents) -> Iterator[EventSequenceBuilder]:
+        # The events are decoded from the arrays of the load, so exactly the same events are segmented
+        # (even if new events were stored in between).
+        generated_sequences = generate_event_sequences(debounced_events.events(), context.event_delay,
+                                                       *context.sequence_limits)
+        if context.task.incremental:
+            generated_sequences, context.open_sequence = self.__hold_back_last(generated_sequences)
+        return generated_sequences
+
+    @staticmethod
+    def __hold_back_last(event_sequences: Iterable[EventSequenceBuilder]
+                         ) -> Tuple[Generator[EventSequenceBuilder, None, None], List[EventSequenceBuilder]]:
+        """Hold back the last of the event sequences.
+
+        The last event sequence might still be extended by events which are not stored yet.
+
+        Parameters
+        ----------
+        event_sequences
+            The event sequences to pass through.
+
+        Returns
+        -------
+        The event sequences except the last one and a list, which holds the last event sequence
+        once the former are consumed.
+        """
+        last: List[EventSequenceBuilder] = []
+
+        def generate() -> Generator[EventSequenceBuilder, None, None]:
+            for event_sequence in event_sequences:
+                if last:
+                    yield last.pop()
+                last.append(event_sequence)
+
+        return generate(), last
+
+
+class MergeStage(Stage):
+    """Merge equal event sequences (and the stored ones on incremental runs)."""
+    name = 'merge'
+
+    def run(self, context: GroupContext, generated_sequences: Iterable[EventSequenceBuilder]) -> GroupResult:
+        task = context.task
+        group = task.group
+
+        # Stored event sequences are only known on incremental runs, because all others start from scratch.
+        event_sequences: List[EventSequence] = []
+        if task.high_water_mark:
+            for stored_sequences in context.database.get_event_sequences(group).values():
+                event_sequences.extend(stored_sequences)
+        number_of_stored = len(event_sequences)
+
+        # Equal event sequences have equal fingerprints, so each one is merged with a single lookup.
+        # Only the first event sequence of each fingerprint is built into a graph.
+        index = {event_sequence.fingerprint: j for j, event_sequence in enumerate(event_sequences)}
+        changed: Set[int] = set()
+        i = 0
+        for builder in generated_sequences:
+            fingerprint = builder.fingerprint
+            j = index.get(fingerprint)
+            if j is None:
+                index[fingerprint] = len(event_sequences)
+                event_sequences.append(builder.build())
+            else:
+                builder.merge_into(event_sequences[j])
+                changed.add(j)
+
+            i += 1
+
+        _logger.info(f'Generated {i} event sequences for group "{group}".')
+        _logger.info(f'Merged down to {len(event_sequences)} event sequences for group "{group}".')
+        METRICS.add('sequences_generated', i)
+        METRICS.add('sequences_merged', i - (len(event_sequences) - number_of_stored))  # merged into another one
+
+        result = GroupResult(group, context.event_delay, context.frame, event_sequences, number_of_stored, changed)
+        if task.incremental and context.open_sequence:
+            # Everything before the open event sequence is processed, so it gets segmented again next time.
+            # Unlike after a normal run, the learned data lacks this event sequence until a later run.
+            open_sequence = context.open_sequence[0]
+            result.high_water_mark = max(task.high_water_mark, open_sequence.root.id - 1)
+            METRICS.add('sequences_held_back')
+            _logger.info(f'Held back the open event sequence of {len(open_sequence)} events for group "{group}", '
+                         f'it is stored by a later incremental run (high-water mark: {result.high_water_mark}).')
+        return result
+
+
+class StoreStage(Stage):
+    """Store the learned data of the group."""
+    name = 'store'
+    writes = True
+
+    def run(self, context: GroupContext, result: GroupResult) -> GroupResult:
+        group = result.group
+        stored = result.event_sequences[:result.number_of_stored]
+        _logger.info(f'Storing event sequences for group "{group}".')
+        context.database.store_event_sequences(
+            group, result.event_sequences[result.number_of_stored:],
+            changed_event_sequences=[stored[i] for i in sorted(result.changed) if i < len(stored)],
+            event_delay=result.event_delay if result.frame is not None else None,
+            high_water_mark=result.high_water_mark
+        )
+        return result
+
+
+class VisualizeStage(Stage):
+    """Plot the event delay search and visualize the stored event sequences (if enabled)."""
+    name = 'visualize'
+
+    def run(self, context: GroupContext, result: GroupResult) -> GroupResult:
+        group = result.group
+        if context.plot and result.frame is not None:
+            if os.path.exists(group + '_data.png'):
+                os.remove(group + '_data.png')
+            data = sorted(result.frame.items())
+            x, y = zip(*data)
+            plt.plot(x, y, label=group)
+            plt.legend()
+            plt.savefig(group + '_data.png')
+            plt.close()
+
+        if context.visualize:
+            for i, event_sequence in enumerate(result.event_sequences):
+                if i < result.number_of_stored and i not in result.changed:
+                    continue
+                event_sequence.visualize(f'{group}/{i}', context.visualize_zero_edges)
+        return result
+
+
+def learning_pipeline() -> Pipeline:
+    """Create the default pipeline to learn a group.
+
+    The stages before 'store' only read from the database, so they can run in any process.
+    """
+    return Pipeline([
+        LoadStage(), DebounceStage(), EventDelayStage(), SegmentStage(), MergeStage(), StoreStage(), VisualizeStage()
+    ])
@@ -0,0 +1,322 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+    from sharly.model.condition import Condition
+
+# Builtin Imports
+import array
+import bisect
+import logging
+
+# Library Imports
+# […]
+
+# Project Imports
+from sharly.model.event import Event
+from sharly.model.event_sequence import EventSequence
+
+_logger = logging.getLogger(__name__)
+
+
+class CompactEventSequence:
+    """A read-mostly event sequence, which is stored in flat arrays instead of a graph.
+
+    Events are referred to by their index in the sequence. The occurrences are stored in a parallel array,
+    the edges as a sorted array of packed keys (u << 32 | v) with a parallel array of weights.
+    Only edges with a positive weight are stored, the virtual edges are derived from the event order
+    (see EventSequence.virtual_edges). The index of each event and the set of nodes are created on first use.
+
+    A compact event sequence supports the same comparisons as an EventSequence (also between both types)
+    and is converted into an EventSequence only for visualization.
+    """
+    __slots__ = ('_id', '_events', '_index', '_nodes', '_occurrences', '_edges', '_weights', '_fake_conditions')
+
+    def __init__(self, events: Sequence[Event], occurrences: Sequence[int],
+                 edges: Iterable[Tuple[int, int, int]], id: Optional[int] = None) -> None:
+        """Create a compact event sequence.
+
+        Parameters
+        ----------
+        events
+            The events in order of their occurrence.
+        occurrences
+            The occurrence of each event.
+        edges
+            The edges (index of event u, index of event v, weight).
+        id
+            The id of the stored event sequence.
+        """
+        self._id = id
+        self._events = tuple(events)
+        self._index: Optional[Dict[Event, int]] = None
+        self._nodes: Optional[FrozenSet[Event]] = None
+        self._occurrences = array.array('l', occurrences)
+        self._fake_conditions = None
+
+        packed = sorted((u << 32 | v, w) for u, v, w in edges if w > 0)
+        self._edges = array.array('Q', [key for key, _ in packed])
+        self._weights = array.array('l', [w for _, w in packed])
+
+    @classmethod
+    def from_event_sequence(cls, event_sequence: EventSequence) -> CompactEventSequence:
+        events = list(event_sequence)
+        index = {event: i for i, event in enumerate(events)}
+        occurrences = [event_sequence.occurrence(event) for event in events]
+        edges = [(index[u], index[v], w) for u, v, w in event_sequence.edges(data='weight')]
+        return cls(events, occurrences, edges, event_sequence._id)
+
+    def to_event_sequence(self) -> EventSequence:
+        event_sequence = EventSequence(self._id)
+        for event, occurrence in zip(self._events, self._occurrences):
+            event_sequence.add_node(event, occurrence=occurrence)
+        for event_u, event_v, weight in self.edges(data='weight'):
+            event_sequence.add_edge(event_u, event_v, weight=weight)
+        return event_sequence
+
+    @property
+    def id(self) -> int:
+        if self._id is None:
+            raise ValueError(f'{self} has not id!')
+        return self._id
+
+    @property
+    def root(self) -> Optional[Event]:
+        return self._events[0] if self._events else None
+
+    @property
+    def predecessor(self) -> Optional[Event]:
+        return self._events[-1] if self._events else None
+
+    @property
+    def conditions(self) -> FrozenSet[Condition]:
+        if self._fake_conditions is not None:
+            return self._fake_conditions
+
+        try:
+            return self.root.conditions
+        except AttributeError:
+            return frozenset()
+
+    @conditions.setter
+    def conditions(self, conditions: FrozenSet[Condition]) -> None:
+        self._fake_conditions = conditions
+
+    @property
+    def nodes(self) -> FrozenSet[Event]:
+        if self._nodes is None:
+            self._nodes = frozenset(self._events)
+        return self._nodes
+
+    @property
+    def __index(self) -> Dict[Event, int]:
+        """The index of each event in the sequence."""
+        if self._index is None:
+            self._index = {event: i for i, event in enumerate(self._events)}
+        return self._index
+
+    @property
+    def fingerprint(self) -> Tuple[FrozenSet[Condition], FrozenSet[Event], FrozenSet[Tuple[Event, Event]]]:
+        """A hashable key, which is equal for all equal event sequences (see EventSequence.fingerprint)."""
+        return self.conditions, self.nodes, frozenset(self.edges())
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(self._events)
+
+    def __str__(self) -> str:
+        if not self._edges:
+            return str(list(self._events))
+        return str(list(self.edges()))
+
+    def __contains__(self, item: Union[Event, EventSequence, CompactEventSequence]) -> bool:
+        if isinstance(item, Event):
+            return item in self.__index
+
+        if self.conditions != item.conditions:
+            return False
+
+        item_edges = frozenset(item.edges())
+        return self.nodes >= frozenset(item.nodes) and frozenset(self.edges()) >= item_edges
+
+    def __eq__(self, other: Union[EventSequence, CompactEventSequence]) -> bool:
+        if self.conditions != other.conditions:
+            return False
+
+        if self.nodes != frozenset(other.nodes):
+            return False
+
+        return frozenset(self.edges()) == frozenset(other.edges())
+
+    def __hash__(self) -> int:
+        # Equal event sequences have equal fingerprints (merging may add edges, which changes the hash).
+        return hash(self.fingerprint)
+
+    def __add__(self, other: Union[EventSequence, CompactEventSequence]) -> CompactEventSequence:
+        if other != self:
+            raise ValueError('Could not add incompatible event sequences!')
+
+        merged_sequence = self.copy()
+        merged_sequence.merge(other)
+        return merged_sequence
+
+    def __iadd__(self, other: Union[EventSequence, CompactEventSequence]) -> CompactEventSequence:
+        if other != self:
+            raise ValueError('Could not add incompatible event sequences!')
+
+        self.merge(other)
+        return self
+
+    def merge(self, other: Union[EventSequence, CompactEventSequence]) -> None:
+        """Add the occurrences and weights of an equal event sequence in place (see EventSequence.merge).
+
+        Parameters
+        ----------
+        other
+            The event sequence to merge into self.
+        """
+        index = self.__index
+        for event in other:
+            i = index.get(event)
+            if i is not None:
+                self._occurrences[i] += other.occurrence(event)
+
+        for event_u, event_v, weight in other.edges(data='weight'):
+            try:
+                u, v = index[event_u], index[event_v]
+            except KeyError:
+                continue
+
+            key = u << 32 | v
+            position = bisect.bisect_left(self._edges, key)
+            if position < len(self._edges) and self._edges[position] == key:
+                self._weights[position] += weight
+            elif weight and u < v:  # the virtual edge becomes a real edge
+                self._edges.insert(position, key)
+                self._weights.insert(position, weight)
+
+    def copy(self) -> CompactEventSequence:
+        event_sequence = CompactEventSequence(self._events, self._occurrences, [], self._id)
+        event_sequence._index, event_sequence._nodes = self._index, self._nodes  # the events are the same
+        event_sequence._edges = array.array('Q', self._edges)
+        event_sequence._weights = array.array('l', self._weights)
+        return event_sequence
+
+    def occurrence(self, event: Event) -> int:
+        return self._occurrences[self.__index[event]]
+
+    def number_of_nodes(self) -> int:
+        return len(self._events)
+
+    def number_of_edges(self) -> int:
+        return len(self._edges)
+
+    def virtual_edges(self) -> Generator[Tuple[Event, Event], None, None]:
+        """Generate the virtual (zero weight) edges between each event and its predecessors."""
+        for v in range(len(self._events)):
+            for u in range(v):
+                key = u << 32 | v
+                position = bisect.bisect_left(self._edges, key)
+                if position == len(self._edges) or self._edges[position] != key:
+                    yield self._events[u], self._events[v]
+
+    def number_of_virtual_edges(self) -> int:
+        n = len(self._events)
+        forward_edges = sum(1 for key in self._edges if key >> 32 < key & 0xFFFFFFFF)
+        return n * (n - 1) // 2 - forward_edges
+
+    def has_edge(self, event_u: Event, event_v: Event) -> bool:
+        index = self.__index
+        try:
+            self.__find_edge(index[event_u], index[event_v])
+        except (KeyError, ValueError):
+            return False
+        return True
+
+    def weight(self, event_u: Event, event_v: Event) -> int:
+        """Get the weight of an edge.
+
+        Raises
+        ------
+        ValueError, if there is no such edge.
+        """
+        index = self.__index
+        try:
+            return self._weights[self.__find_edge(index[event_u], index[event_v])]
+        except KeyError:
+            raise ValueError(f'No edge ({event_u}, {event_v}) in {self}!')
+
+    def edges(self, data: Optional[str] = None) -> Iterator[Union[Tuple[Event, Event], Tuple[Event, Event, int]]]:
+        """Iterate over the edges like networkx.DiGraph.edges (data may be None or 'weight')."""
+        for key, weight in zip(self._edges, self._weights):
+            event_u, event_v = self._events[key >> 32], self._events[key & 0xFFFFFFFF]
+            if data is None:
+                yield event_u, event_v
+            else:
+                yield event_u, event_v, weight
+
+    def __find_edge(self, u: int, v: int) -> int:
+        """Get the position of an edge in the edge arrays.
+
+        Raises
+        ------
+        ValueError, if there is no such edge.
+        """
+        key = u << 32 | v
+        position = bisect.bisect_left(self._edges, key)
+        if position == len(self._edges) or self._edges[position] != key:
+            raise ValueError(f'No edge ({u}, {v}) in {self}!')
+        return position
+
+    def is_anomaly(self, other: Union[EventSequence, CompactEventSequence], w: int) -> bool:
+        """Check if other is an anomaly in consideration against self (see EventSequence.is_anomaly)."""
+        if other != self:
+            return True
+
+        for event_u, event_v, weight in other.edges(data='weight'):
+            if weight:
+                try:
+                    if self.weight(event_u, event_v) < w:
+                        return True
+                except ValueError:
+                    continue
+
+        return False
+
+    def get_similarity_score(self, other: Union[EventSequence, CompactEventSequence]) -> float:
+        node_score = self.get_node_similarity(other)
+        edge_score = self.get_edge_similarity(other)
+        conditions_score = self.get_conditions_similarity(other)
+        return ((3 * edge_score) + (2 * conditions_score) + node_score) / 3
+
+    def get_node_similarity(self, other: Union[EventSequence, CompactEventSequence]) -> float:
+        common_nodes = self.nodes & frozenset(other.nodes)
+        try:
+            return len(common_nodes) / other.number_of_nodes()
+        except ZeroDivisionError:
+            return 0.0
+
+    def get_edge_similarity(self, other: Union[EventSequence, CompactEventSequence]) -> float:
+        self_edges = frozenset(self.edges()) | frozenset(self.virtual_edges())
+        common_edges = self_edges & frozenset(other.edges())
+        try:
+            return len(common_edges) / (other.number_of_edges() + other.number_of_virtual_edges())
+        except ZeroDivisionError:
+            return 0.0
+
+    def get_conditions_similarity(self, other: Union[EventSequence, CompactEventSequence]) -> float:
+        common_conditions = frozenset(self.conditions) & frozenset(other.conditions)
+        try:
+            return len(common_conditions) / len(other.conditions)
+        except ZeroDivisionError:
+            return 0.0
+
+    def visualize(self, filename: str, visualize_zero_edges: bool = False, explanation: str = None) -> None:
+        """Store the event sequence as image (see EventSequence.visualize)."""
+        self.to_event_sequence().visualize(filename, visualize_zero_edges, explanation)
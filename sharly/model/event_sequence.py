@@ -24,7 +24,12 @@ _logger = logging.getLogger(__name__)
 
 
 class EventSequence(networkx.DiGraph):
-    """An event sequence is a sequence of events that occurs within T seconds of a previous event."""
+    """An event sequence is a sequence of events that occurs within T seconds of a previous event.
+
+    The nodes are kept in order of their occurrence. Only edges with a weight are stored in the graph,
+    the virtual edges between an event and all of its predecessors are derived from the node order
+    (see add_event and virtual_edges).
+    """
     def __init__(self, id: Optional[int] = None) -> None:
         super().__init__()
         self._id = id
@@ -38,17 +43,11 @@ class EventSequence(networkx.DiGraph):
 
     @property
     def root(self) -> Optional[Event]:
-        try:
-            return list(self)[0]
-        except IndexError:
-            return None
+        return next(iter(self._node), None)
 
     @property
     def predecessor(self) -> Optional[Event]:
-        try:
-            return list(self)[-1]
-        except IndexError:
-            return None
+        return next(reversed(self._node), None)
 
     @property
     def conditions(self) -> FrozenSet[Condition]:
@@ -76,8 +75,8 @@ class EventSequence(networkx.DiGraph):
         if self.conditions != item.conditions:
             return False
 
-        self_edges = frozenset([(u, v) for u, v, w in self.edges(data='weight') if w > 0])
-        item_edges = frozenset([(u, v) for u, v, w in item.edges(data='weight') if w > 0])
+        self_edges = frozenset(self.edges())
+        item_edges = frozenset(item.edges())
 
         self_nodes = frozenset(self.nodes)
         item_nodes = frozenset(item.nodes)
@@ -93,8 +92,8 @@ class EventSequence(networkx.DiGraph):
         if self_nodes != other_nodes:
             return False
 
-        self_edges = frozenset([(u, v) for u, v, w in self.edges(data='weight') if w > 0])
-        other_edges = frozenset([(u, v) for u, v, w in other.edges(data='weight') if w > 0])
+        self_edges = frozenset(self.edges())
+        other_edges = frozenset(other.edges())
         return self_edges == other_edges
 
     def __add__(self, other: EventSequence) -> EventSequence:
@@ -102,27 +101,65 @@ class EventSequence(networkx.DiGraph):
             raise ValueError('Could not add incompatible event sequences!')
 
         merged_sequence = self.copy()
-        for event, data in other.nodes(data=True):
+        merged_sequence.merge(other)
+        return merged_sequence
+
+    def __iadd__(self, other: EventSequence) -> EventSequence:
+        if other != self:
+            raise ValueError('Could not add incompatible event sequences!')
+
+        self.merge(other)
+        return self
+
+    @property
+    def fingerprint(self) -> Tuple[FrozenSet[Condition], FrozenSet[Event], FrozenSet[Tuple[Event, Event]]]:
+        """A hashable key, which is equal for all equal event sequences (see __eq__)."""
+        return self.conditions, frozenset(self.nodes), frozenset(self.edges())
+
+    def merge(self, other: EventSequence) -> None:
+        """Add the occurrences and weights of an equal event sequence in place.
+
+        In contrast to +=, this method does not check if the event sequences are equal.
+        This is left to the caller, e.g. by comparing their fingerprints.
+
+        Parameters
+        ----------
+        other
+            The event sequence to merge into self.
+        """
+        for event in other:
             if self.has_node(event):
-                merged_sequence.nodes[event]['occurrence'] += data['occurrence']
+                self.nodes[event]['occurrence'] += other.occurrence(event)
 
-        for event_u, event_v, data in other.edges(data=True):
+        position = {event: i for i, event in enumerate(self)}
+        for event_u, event_v, weight in other.edges(data='weight'):
             if self.has_edge(event_u, event_v):
-                merged_sequence[event_u][event_v]['weight'] += data['weight']
+                self[event_u][event_v]['weight'] += weight
+            elif weight and event_u in position and event_v in position and position[event_u] < position[event_v]:
+                self.add_edge(event_u, event_v, weight=weight)  # the virtual edge becomes a real edge
 
-        return merged_sequence
+    def copy(self, as_view: bool = False) -> EventSequence:
+        event_sequence = super().copy(as_view)
+        if not as_view:
+            event_sequence._id = self._id  # copies still refer to the stored event sequence
+        return event_sequence
 
-    def add_event(self, event: Event, event_delay: int) -> bool:
+    def occurrence(self, event: Event) -> int:
+        return self.nodes[event]['occurrence']
+
+    def add_event(self, event: Event, event_delay: int, max_length: int = 0, max_span: int = 0) -> bool:
         """Add an event to the sequence.
 
         Event sequences may include events from more than one user because a typical
         smart home has multiple users. Those events should be treated as noise.
         It is not possible to directly detect those noisy events.
-        What is done instead, is that this method builds all "combinations" of events in an event sequence.
+        What is done instead, is that each event is connected with all of its predecessors ("combinations").
         Let's consider we have an event sequence: S = [0 -> 1 -> 2] where E=1 is sensor noise.
-        So the essential sequence we would like to learn later is S = [0 -> 2]. To achieve this we simply
-        add an edge between E=0 and E=2. We doing this on adding a new event and connect it with all predecessors.
-        Now there is an edge between E=0 and E=2. And if this sequence occurs often, the edge-weight gets increased.
+        So the essential sequence we would like to learn later is S = [0 -> 2]. To achieve this
+        there is a virtual edge between E=0 and E=2. And if this sequence occurs often, the edge-weight gets increased.
+
+        Only the edge to the direct predecessor is added to the graph. The virtual edges are derived from the
+        node order (see virtual_edges) and become real edges, once a merge gives them a weight.
 
         Parameters
         ----------
@@ -130,6 +167,10 @@ class EventSequence(networkx.DiGraph):
             The event to add.
         event_delay
             The maximum allowed delay between two events.
+        max_length
+            The maximum number of events in the sequence (default = 0, unlimited).
+        max_span
+            The maximum time (in sec) between the root and the last event of the sequence (default = 0, unlimited).
         Returns
         -------
         True, if the event was added, False otherwise.
@@ -141,21 +182,34 @@ class EventSequence(networkx.DiGraph):
             if (event.timestamp - self.predecessor.timestamp).total_seconds() > event_delay:
                 return False
 
+            if max_length and len(self) >= max_length:
+                return False
+
+            if max_span and (event.timestamp - self.root.timestamp).total_seconds() > max_span:
+                return False
+
         predecessor = self.predecessor  # store predecessor before adding new node
         self.add_node(event, occurrence=1)
 
         if predecessor:
             self.add_edge(predecessor, event, weight=1)
 
-            # Combinations (see docstring):
-            predecessors = [e for e in self.nodes if e not in (event, predecessor)]
-            for p in predecessors:
-                # Zero weight because it is (for now) a virtual edge.
-                # Might change after merging with other event sequences.
-                self.add_edge(p, event, weight=0)
-
         return True
 
+    def virtual_edges(self) -> Generator[Tuple[Event, Event], None, None]:
+        """Generate the virtual (zero weight) edges between each event and its predecessors (see add_event)."""
+        events = list(self)
+        for i, event_v in enumerate(events):
+            for event_u in events[:i]:
+                if not self.has_edge(event_u, event_v):
+                    yield event_u, event_v
+
+    def number_of_virtual_edges(self) -> int:
+        position = {event: i for i, event in enumerate(self)}
+        n = len(position)
+        forward_edges = sum(1 for u, v in self.edges() if position[u] < position[v])
+        return n * (n - 1) // 2 - forward_edges
+
     def is_anomaly(self, other: EventSequence, w: int) -> bool:
         """Check if other is an anomaly in consideration against self.
 
@@ -197,11 +251,11 @@ class EventSequence(networkx.DiGraph):
             return 0.0
 
     def get_edge_similarity(self, other: EventSequence) -> float:
-        self_edges = frozenset(self.edges)
-        other_edges = frozenset([(u, v) for u, v, w in other.edges(data='weight') if w > 0])
+        self_edges = frozenset(self.edges()) | frozenset(self.virtual_edges())
+        other_edges = frozenset(other.edges())
         common_edges = self_edges & other_edges
         try:
-            return len(common_edges) / other.number_of_edges()
+            return len(common_edges) / (other.number_of_edges() + other.number_of_virtual_edges())
         except ZeroDivisionError:
             return 0.0
 
@@ -239,11 +293,11 @@ class EventSequence(networkx.DiGraph):
         networkx.draw_networkx_nodes(self, node_positions, node_color=node_colors, node_size=400)
 
         if visualize_zero_edges:
-            pseudo_edges = [(u, v) for u, v, d in self.edges(data=True) if d['weight'] == 0]
+            pseudo_edges = list(self.virtual_edges())
             networkx.draw_networkx_edges(self, node_positions, edgelist=pseudo_edges, edge_color='#a9a9a9',
                                          style='dotted', alpha=.5)
 
-        real_edges = [(u, v) for u, v, d in self.edges(data=True) if d['weight'] > 0]
+        real_edges = list(self.edges())
         networkx.draw_networkx_edges(self, node_positions, edgelist=real_edges, edge_color='#a9a9a9')
 
         node_labels = {n: f'{n}\n{o}' for n, o in networkx.get_node_attributes(self, 'occurrence').items()}
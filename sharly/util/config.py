@@ -39,6 +39,11 @@ class _Config:
         self._database_user = parser.get('DATABASE', 'user')
         self._database_password = parser.get('DATABASE', 'password')
         self._database_name = parser.get('DATABASE', 'name')
+        self._database_pragmas = {
+            'synchronous': parser.get('DATABASE', 'synchronous', fallback=None),
+            'cache_size': parser.getint('DATABASE', 'cache_size', fallback=None),
+            'mmap_size': parser.getint('DATABASE', 'mmap_size', fallback=None),
+        }
 
         # Parameters
         self._t_init = parser.getint('PARAMETERS', 't_init')
@@ -46,6 +51,8 @@ class _Config:
         self._t_inc_stable = parser.getint('PARAMETERS', 't_inc_stable')
         self._n = parser.getint('PARAMETERS', 'n')
         self._anomaly_weight_threshold = parser.getint('PARAMETERS', 'anomaly_weight_threshold')
+        self._max_sequence_length = parser.getint('PARAMETERS', 'max_sequence_length', fallback=0)
+        self._max_sequence_span = parser.getint('PARAMETERS', 'max_sequence_span', fallback=0)
 
     @property
     def item_list(self) -> str:
@@ -75,6 +82,11 @@ class _Config:
     def database_name(self) -> str:
         return self._database_name
 
+    @property
+    def database_pragmas(self) -> Dict[str, Union[str, int]]:
+        """The configured pragmas of SQLite databases (the others keep the defaults of SQLite)."""
+        return {name: value for name, value in self._database_pragmas.items() if value is not None}
+
     @property
     def t_init(self) -> int:
         return self._t_init
@@ -95,5 +107,15 @@ class _Config:
     def anomaly_weight_threshold(self) -> int:
         return self._anomaly_weight_threshold
 
+    @property
+    def max_sequence_length(self) -> int:
+        """The maximum number of events of an event sequence (0 = unlimited)."""
+        return self._max_sequence_length
+
+    @property
+    def max_sequence_span(self) -> int:
+        """The maximum time (in sec) between the first and the last event of an event sequence (0 = unlimited)."""
+        return self._max_sequence_span
+
 
 CONFIG = _Config('config.ini')
@@ -27,6 +27,8 @@ class _ItemList:
         self._items: Dict[str, Tuple[Set, Set]] = {}
         self._conditions: Dict[str, Condition.Type] = {}
         self._rejected_states: Set[str] = set()
+        self._sequence_limits: Dict[str, Tuple[int, int]] = {}
+        self._debounce_windows: Dict[str, float] = {}
         self.__load(filename)
 
     def __load(self, filename: str) -> None:
@@ -59,6 +61,12 @@ class _ItemList:
 
                     self._items[name] = (groups, states)
 
+                    if 'debounce' in item_dict:
+                        try:
+                            self._debounce_windows[name] = float(item_dict['debounce'])
+                        except (TypeError, ValueError):
+                            raise ValueError(f'Invalid debounce option for item "{name}"!')
+
                 for condition_dict in data.get('conditions', []):
                     try:
                         name = condition_dict['name']
@@ -80,6 +88,20 @@ class _ItemList:
                 for state in data.get('rejected_states', []):
                     self._rejected_states.add(state)
 
+                for group_dict in data.get('groups', []):
+                    try:
+                        name = group_dict['name']
+                    except KeyError as e:
+                        raise ValueError(f'Missing option {e} on group entry: {group_dict}!')
+
+                    try:
+                        max_length = int(group_dict.get('max_length', CONFIG.max_sequence_length))
+                        max_span = int(group_dict.get('max_span', CONFIG.max_sequence_span))
+                    except (TypeError, ValueError):
+                        raise ValueError(f'Invalid sequence limits for group "{name}"!')
+
+                    self._sequence_limits[name] = (max_length, max_span)
+
         except IOError:
             _logger.exception(f'Could not find item list file: {filename}!')
             raise
@@ -91,10 +113,41 @@ class _ItemList:
     def conditions(self) -> ItemsView[str, Condition.Type]:
         return self._conditions.items()
 
+    @property
+    def items(self) -> ItemsView[str, Tuple[Set[str], Set[str]]]:
+        """The accepted groups and states of each item."""
+        return self._items.items()
+
+    @property
+    def rejected_states(self) -> Set[str]:
+        return set(self._rejected_states)
+
     @property
     def groups(self) -> Set[str]:
         return set([group for groups, _ in self._items.values() for group in groups])
 
+    def get_sequence_limits(self, group: str) -> Tuple[int, int]:
+        """Get the maximum number of events and the maximum time span (in sec) of event sequences of a group.
+
+        Groups without an entry in the item list use the limits of the config (0 = unlimited).
+
+        Parameters
+        ----------
+        group : str
+            The name of the group.
+        """
+        return self._sequence_limits.get(group, (CONFIG.max_sequence_length, CONFIG.max_sequence_span))
+
+    def get_debounce_window(self, item_name: str) -> float:
+        """Get the time (in sec) in which repeated events of an item are ignored (0 = no debouncing).
+
+        Parameters
+        ----------
+        item_name : str
+            The name of the item.
+        """
+        return self._debounce_windows.get(item_name, 0.0)
+
     def get_item_groups(self, item_name: str) -> Set[str]:
         """Get the groups associated with an item.
 
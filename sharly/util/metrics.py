@@ -0,0 +1,183 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+
+# Builtin Imports
+import collections
+import contextlib
+import logging
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Library Imports
+# […]
+
+# Project Imports
+# […]
+
+_logger = logging.getLogger(__name__)
+
+
+def peak_memory(children: bool = False) -> Optional[int]:
+    """Get the peak resident memory (in KiB) of this process or of its terminated children (None, if unknown)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # macOS reports bytes
+
+
+class _Metrics:
+    """Counters and timings of the current run, recorded per group.
+
+    Recording is disabled by default, so instrumented code costs a single check.
+    Counters are added up, except for peak memory, which keeps the maximum.
+    """
+    _MAXIMA = frozenset({'peak_memory_kib'})
+
+    def __init__(self) -> None:
+        self._enabled = False
+        self._group = ''  # counters outside a group are recorded in ''
+        self._groups: Dict[str, Dict[str, float]] = collections.defaultdict(dict)
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def enable(self) -> None:
+        self._enabled = True
+
+    @property
+    def groups(self) -> Dict[str, Dict[str, float]]:
+        """The counters of each group."""
+        return dict(self._groups)
+
+    @contextlib.contextmanager
+    def group(self, group: str) -> Generator[None, None, None]:
+        """Record the counters inside the context for a group, including its time and the peak memory."""
+        if not self._enabled:
+            yield
+            return
+
+        previous_group, self._group = self._group, group
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add('seconds', time.perf_counter() - start)
+            self.add('peak_memory_kib', peak_memory() or 0)
+            self._group = previous_group
+
+    def add(self, name: str, value: float = 1) -> None:
+        """Add a value to a counter of the current group."""
+        if not self._enabled:
+            return
+
+        counters = self._groups[self._group]
+        if name in self._MAXIMA:
+            counters[name] = max(counters.get(name, value), value)
+        else:
+            counters[name] = counters.get(name, 0) + value
+
+    @contextlib.contextmanager
+    def timer(self, name: str) -> Generator[None, None, None]:
+        """Add the time (in ms) spent inside the context to a counter of the current group."""
+        if not self._enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def merge(self, groups: Dict[str, Dict[str, float]]) -> None:
+        """Add the counters of other groups, e.g. recorded in another process."""
+        for group, counters in groups.items():
+            previous_group, self._group = self._group, group
+            for name, value in counters.items():
+                self.add(name, value)
+            self._group = previous_group
+
+    def pop(self, group: str) -> Dict[str, Dict[str, float]]:
+        """Remove and get the counters of a group (to send them to another process)."""
+        return {group: self._groups.pop(group)} if group in self._groups else {}
+
+    def report(self) -> Dict[str, Any]:
+        """Get all counters with their totals over all groups."""
+        total: Dict[str, float] = {}
+        for counters in self._groups.values():
+            for name, value in counters.items():
+                if name in self._MAXIMA:
+                    total[name] = max(total.get(name, value), value)
+                else:
+                    total[name] = total.get(name, 0) + value
+
+        return {
+            'groups': {group or 'other': dict(counters) for group, counters in sorted(self._groups.items())},
+            'total': total,
+            'peak_memory_kib': peak_memory(),
+            'workers_peak_memory_kib': peak_memory(children=True),
+        }
+
+
+class StackSampler:
+    """A sampling profiler for the calling thread, which counts collapsed stacks.
+
+    The collapsed stacks ("outer;inner count" per line) are the input format of flame graph tools.
+    Other threads and processes are not sampled.
+    """
+    def __init__(self, interval: float = .005) -> None:
+        """Create a sampler.
+
+        Parameters
+        ----------
+        interval
+            The time (in sec) between two samples.
+        """
+        self._interval = interval
+        self._thread_id = threading.get_ident()
+        self._stacks: Counter[str] = collections.Counter()
+        self._running = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> StackSampler:
+        self._running.set()
+        self._thread = threading.Thread(target=self.__sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self._running.clear()
+        self._thread.join()
+
+    def dump(self, filename: str) -> None:
+        with open(filename, 'w') as fp:
+            for stack, count in self._stacks.most_common():
+                fp.write(f'{stack} {count}\n')
+
+    def __sample(self) -> None:
+        while self._running.is_set():
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self._stacks[';'.join(reversed(stack))] += 1
+            time.sleep(self._interval)
+
+
+METRICS = _Metrics()
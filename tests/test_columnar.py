@@ -0,0 +1,44 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+
+# Builtin Imports
+import datetime
+import os
+
+# Library Imports
+# […]
+
+# Project Imports
+from sharly.database.columnar import ColumnarDatabase
+from sharly.model.condition.temperature import TemperatureCondition
+from sharly.model.event import Event, Item
+
+
+def test_reopen_after_an_interrupted_append(tmp_path):
+    database_name = str(tmp_path / 'sharly')
+    database = ColumnarDatabase(database_name, clear=True)
+    conditions = frozenset({TemperatureCondition.from_value(20)})
+    database.store_events([Event(Item('Wasserkocher', 'OFF', 'ON'), datetime.datetime.now(), conditions)])
+    database.store_event_delay('Kueche', 42)
+    database.disconnect()
+
+    # Simulate appends, which were interrupted in the middle of a line.
+    for filename in ('conditions.jsonl', 'learned.jsonl'):
+        with open(os.path.join(f'{database_name}.columns', filename), 'a') as fp:
+            fp.write('[[1, 2')
+
+    database = ColumnarDatabase(database_name, clear=False)
+    events = database.get_events('Kueche')
+    assert [event.conditions for event in events] == [conditions]
+    assert database.get_event_delay('Kueche') == 42
+
+    # New records are appended after the complete lines.
+    database.store_event_delay('Kueche', 43)
+    database.disconnect()
+    assert ColumnarDatabase(database_name, clear=False).get_event_delay('Kueche') == 43
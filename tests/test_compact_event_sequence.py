@@ -0,0 +1,61 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+
+# Builtin Imports
+import datetime
+
+# Library Imports
+# […]
+
+# Project Imports
+from sharly.model.compact_event_sequence import CompactEventSequence
+from sharly.model.event import Event, Item
+from sharly.model.event_sequence import EventSequence
+
+_EVENTS = [
+    Event(Item(f'item{i}', 'OFF', 'ON'), datetime.datetime(2021, 1, 1) + datetime.timedelta(seconds=i), id=i + 1)
+    for i in range(4)
+]
+
+
+def _event_sequence(edges: Iterable[Tuple[int, int, int]]) -> EventSequence:
+    event_sequence = EventSequence()
+    for event in _EVENTS:
+        event_sequence.add_node(event, occurrence=1)
+    for u, v, weight in edges:
+        event_sequence.add_edge(_EVENTS[u], _EVENTS[v], weight=weight)
+    return event_sequence
+
+
+def _graph(event_sequence: EventSequence) -> Tuple[List[Tuple[Event, int]], List[Tuple[Event, Event, int]]]:
+    nodes = [(event, event_sequence.occurrence(event)) for event in event_sequence]
+    edges = sorted(event_sequence.edges(data='weight'), key=lambda edge: (edge[0].id, edge[1].id))
+    return nodes, edges
+
+
+def test_merge_like_event_sequence():
+    # The edges (0, 2) and (1, 3) are virtual edges of the first event sequence.
+    event_sequence = _event_sequence([(0, 1, 1), (1, 2, 1), (2, 3, 1)])
+    other = _event_sequence([(0, 1, 2), (0, 2, 1), (1, 3, 3), (2, 3, 1)])
+
+    compact_event_sequence = CompactEventSequence.from_event_sequence(event_sequence)
+    compact_event_sequence.merge(CompactEventSequence.from_event_sequence(other))
+    event_sequence.merge(other)
+
+    assert _graph(compact_event_sequence.to_event_sequence()) == _graph(event_sequence)
+
+
+def test_hash_is_consistent_with_equality():
+    event_sequence = _event_sequence([(0, 1, 1), (2, 3, 1)])
+    compact_event_sequence = CompactEventSequence.from_event_sequence(event_sequence)
+    copy = CompactEventSequence.from_event_sequence(event_sequence)
+
+    assert compact_event_sequence == copy
+    assert hash(compact_event_sequence) == hash(copy)
+    assert len({compact_event_sequence, copy}) == 1
@@ -0,0 +1,36 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+
+# Builtin Imports
+import datetime
+
+# Library Imports
+# […]
+
+# Project Imports
+from sharly.learning.debounce import debounce_events
+from sharly.model.condition.temperature import TemperatureCondition
+from sharly.model.event import Event, Item
+
+
+def test_debounced_events_are_decoded_like_the_loaded_events():
+    start = datetime.datetime(2021, 1, 1, 8, 0, 0, 123456)
+    conditions = frozenset({TemperatureCondition.from_value(20)})
+    events = [
+        Event(Item('Wasserkocher', 'OFF', 'ON'), start, conditions, 1),
+        Event(Item('Wasserkocher', 'OFF', 'ON'), start + datetime.timedelta(seconds=.5), conditions, 2),  # repeated
+        Event(Item('Kaffeemaschine', 'OFF', 'ON'), start + datetime.timedelta(seconds=30), frozenset(), 5),
+    ]
+
+    decoded = list(debounce_events(events).events())
+
+    assert [event.id for event in decoded] == [1, 5]
+    assert [event.timestamp for event in decoded] == [events[0].timestamp, events[2].timestamp]
+    assert [event.item for event in decoded] == [events[0].item, events[2].item]
+    assert [event.conditions for event in decoded] == [events[0].conditions, events[2].conditions]
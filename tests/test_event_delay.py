@@ -0,0 +1,52 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+
+# Builtin Imports
+import datetime
+import random
+
+# Library Imports
+# […]
+
+# Project Imports
+from sharly.learning.debounce import DebouncedEvents, debounce_events
+from sharly.learning.stages import EventDelayStage, GroupContext, GroupTask
+from sharly.model.event import Event, Item
+from sharly.util.config import CONFIG
+
+
+def _events(seed: int) -> List[Event]:
+    """Get events of a few items, which occur in bursts with longer pauses in between."""
+    rnd = random.Random(seed)
+    timestamp = datetime.datetime(2021, 1, 1)
+    events = []
+    for i in range(400):
+        if rnd.random() < .5:
+            gap = rnd.expovariate(1 / 5)
+        else:
+            gap = rnd.choice([40, 90, 150, 300]) + rnd.random() * 10
+        timestamp += datetime.timedelta(seconds=gap)
+        events.append(Event(Item(f'item{rnd.randrange(8)}', 'OFF', 'ON'), timestamp, id=i + 1))
+    return events
+
+
+def _event_delay(debounced_events: DebouncedEvents, previous_event_delay: int) -> int:
+    context = GroupContext(None, GroupTask('Kueche', 7, previous_event_delay))
+    EventDelayStage().run(context, debounced_events)
+    return context.event_delay
+
+
+def test_warm_start_equals_cold_start_on_changed_data():
+    for seed in range(3):
+        debounced_events = debounce_events(_events(seed))
+        event_delay = _event_delay(debounced_events, 0)
+
+        # The previous event delays were learned on other data, e.g. before the habits changed.
+        for previous_event_delay in range(CONFIG.t_init, 6 * CONFIG.t_inc_stable, 3):
+            assert _event_delay(debounced_events, previous_event_delay) == event_delay, (seed, previous_event_delay)
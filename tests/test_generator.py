@@ -0,0 +1,28 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+
+# Builtin Imports
+import datetime
+
+# Library Imports
+# […]
+
+# Project Imports
+from benchmarks.generator import HouseholdGenerator
+
+
+def test_events_are_not_in_the_future():
+    household = HouseholdGenerator(10)
+    start = datetime.datetime.now() - datetime.timedelta(days=6)
+    events = list(household.events(6000, days=6))
+    now = datetime.datetime.now()
+
+    assert len(events) == 6000
+    assert all(start <= event.timestamp <= now for event in events)
+    assert all(a.timestamp <= b.timestamp for a, b in zip(events, events[1:]))
@@ -0,0 +1,73 @@
+# Future Imports
+from __future__ import annotations
+
+# Typing Imports
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import *
+
+# Builtin Imports
+import datetime
+import sqlite3
+import threading
+
+# Library Imports
+import pytest
+
+# Project Imports
+from sharly.database.sqlite import SQLiteDatabase
+from sharly.model.condition.temperature import TemperatureCondition
+from sharly.model.event import Event, Item
+
+
+def _event(minutes: int, temperature: int) -> Event:
+    timestamp = datetime.datetime.now() - datetime.timedelta(minutes=minutes)
+    return Event(Item('Wasserkocher', 'OFF', 'ON'), timestamp, frozenset({TemperatureCondition.from_value(temperature)}))
+
+
+def test_conditions_of_older_events_after_reopening(tmp_path):
+    database_name = str(tmp_path / 'sharly')
+    database = SQLiteDatabase(database_name, clear=True)
+    database.store_events([_event(3, 10), _event(2, 20)])
+    database.disconnect()
+
+    # Storing a new condition set caches a newer id, before the older ones were ever read.
+    database = SQLiteDatabase(database_name, clear=False)
+    database.store_event(_event(1, 30))
+    events = database.get_events('Kueche')
+    database.disconnect()
+
+    assert [event.conditions for event in events] == [_event(0, value).conditions for value in (10, 20, 30)]
+
+
+def test_disconnect_closes_the_connections_of_all_threads(tmp_path):
+    database = SQLiteDatabase(str(tmp_path / 'sharly'), clear=True)
+    connections = []
+
+    def read() -> None:
+        database.get_events('Kueche')
+        connections.append(database.connection)
+
+    threads = [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    database.disconnect()
+
+    assert len(connections) == 3
+    for connection in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute('SELECT 1')
+
+
+def test_release_closes_the_connection_of_the_calling_thread(tmp_path):
+    database = SQLiteDatabase(str(tmp_path / 'sharly'), clear=True)
+    connection = database.connection
+    database.release()
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        connection.execute('SELECT 1')
+    assert database.connection is not connection  # opened again on next use
+    database.disconnect()